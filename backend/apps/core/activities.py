@@ -0,0 +1,107 @@
+"""
+Activity queries shared by core and the business modules.
+"""
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Activity
+
+ACTIVITY_SUMMARY_CACHE_TIMEOUT = 30
+UPCOMING_ACTIVITY_DAYS = 7
+
+
+def content_type_ids(*models):
+    """
+    Return content type ids for ``models``.
+
+    ``ContentType`` lookups are served from the manager's process-wide
+    cache, so this hits the database at most once per process.
+    """
+    return [content_type.pk for content_type in ContentType.objects.get_for_models(*models).values()]
+
+
+def overdue_activities(organization, models=None, user=None, now=None):
+    """
+    Open activities scheduled before ``now``, oldest first.
+
+    Optionally restricted to activities attached to ``models`` or assigned
+    to ``user``. Served by the partial ``(organization, scheduled_date)``
+    index on open statuses.
+    """
+    queryset = Activity.objects.filter(
+        organization=organization,
+        status__in=Activity.OPEN_STATUSES,
+        scheduled_date__lt=now or timezone.now()
+    )
+    if models:
+        queryset = queryset.filter(content_type_id__in=content_type_ids(*models))
+    if user is not None:
+        queryset = queryset.filter(assigned_to=user)
+    return queryset.select_related('assigned_to', 'created_by').order_by('scheduled_date')
+
+
+def activity_summary(organization, user=None, now=None):
+    """
+    Count activities by state, type and priority with a single aggregate.
+
+    Every time bucket is evaluated against the same ``now``. Restricted to
+    activities assigned to ``user`` when given.
+    """
+    now = now or timezone.now()
+    queryset = Activity.objects.filter(organization=organization)
+    if user is not None:
+        queryset = queryset.filter(assigned_to=user)
+
+    open_activity = Q(status__in=Activity.OPEN_STATUSES)
+    counts = queryset.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        overdue=Count('id', filter=open_activity & Q(scheduled_date__lt=now)),
+        upcoming=Count('id', filter=open_activity & Q(
+            scheduled_date__gte=now,
+            scheduled_date__lte=now + timedelta(days=UPCOMING_ACTIVITY_DAYS)
+        )),
+        **{
+            f'type_{value}': Count('id', filter=Q(activity_type=value))
+            for value, label in Activity.ACTIVITY_TYPES
+        },
+        **{
+            f'priority_{value}': Count('id', filter=Q(priority=value))
+            for value, label in Activity.PRIORITY_CHOICES
+        }
+    )
+
+    total = counts['total']
+    return {
+        'total_activities': total,
+        'completed_activities': counts['completed'],
+        'overdue_activities': counts['overdue'],
+        'upcoming_activities': counts['upcoming'],
+        'completion_rate': round(counts['completed'] / total * 100, 2) if total > 0 else 0,
+        'by_type': {value: counts[f'type_{value}'] for value, label in Activity.ACTIVITY_TYPES},
+        'by_priority': {value: counts[f'priority_{value}'] for value, label in Activity.PRIORITY_CHOICES},
+        'as_of': now,
+    }
+
+
+def activity_summary_cache_key(user_id):
+    return f'core:activity-summary:{user_id}'
+
+
+def get_activity_summary(user):
+    """
+    Return the activity summary shown to ``user``, cached briefly per user.
+
+    Users allowed to view all activities get organization-wide figures.
+    """
+    key = activity_summary_cache_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        scope = None if user.has_organization_permission('view_all_activities') else user
+        summary = activity_summary(user.organization, user=scope)
+        cache.set(key, summary, ACTIVITY_SUMMARY_CACHE_TIMEOUT)
+    return summary
@@ -5,7 +5,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
     Tag, Note, Attachment, Activity, Dashboard, Widget, Report,
-    Workflow, WorkflowExecution, Setting, Notification, SystemLog
+    Workflow, WorkflowExecution, Setting, Notification, RecordCounter, SystemLog
 )
 
 
@@ -164,6 +164,21 @@ class NotificationAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 
+@admin.register(RecordCounter)
+class RecordCounterAdmin(admin.ModelAdmin):
+    """Read-only admin for maintained record counters."""
+    
+    list_display = ['model_label', 'organization', 'count', 'reconciled_at', 'updated_at']
+    list_filter = ['model_label', 'organization']
+    list_select_related = ['organization']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(SystemLog)
 class SystemLogAdmin(admin.ModelAdmin):
     """Admin for SystemLog model."""
@@ -8,3 +8,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Core'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.core.signals  # noqa F401
@@ -0,0 +1,191 @@
+"""
+Per-organization record counters.
+
+Models registered with ``track_record_count`` keep one ``RecordCounter``
+row per organization, adjusted from their save and delete signals, so
+record totals are read without ``COUNT(*)`` over large tables. Deltas are
+summed per transaction and applied once it commits, so writers never hold
+a counter row lock. Bulk writes bypass model signals and concurrent first
+inserts can double count; ``reconcile_record_counts`` corrects the drift.
+"""
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import RecordCounter
+
+# Tables estimated above this size are only recounted once they drift
+EXACT_COUNT_THRESHOLD = 100000
+# Relative gap between counters and the planner estimate that triggers a recount
+RECOUNT_TOLERANCE = 0.1
+# Seconds before a missing counter's recount may be queued again
+RECOUNT_SCHEDULE_TIMEOUT = 300
+
+counted_models = []
+_local = threading.local()
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def track_record_count(model):
+    """Maintain per-organization counters for ``model``."""
+    if model in counted_models:
+        return
+    counted_models.append(model)
+    label = model_label(model)
+    post_save.connect(count_created_record, sender=model, dispatch_uid=f'record-count-save:{label}')
+    post_delete.connect(count_deleted_record, sender=model, dispatch_uid=f'record-count-delete:{label}')
+
+
+def count_created_record(sender, instance, created, raw=False, using=None, **kwargs):
+    if created and not raw:
+        adjust_record_count(instance.organization_id, sender, 1, using)
+
+
+def count_deleted_record(sender, instance, using=None, **kwargs):
+    adjust_record_count(instance.organization_id, sender, -1, using)
+
+
+class CountBatch:
+    """Counter deltas of one transaction, applied together on commit."""
+
+    def __init__(self):
+        self.deltas = Counter()
+
+    def flush(self):
+        for (organization_id, model), delta in self.deltas.items():
+            if delta:
+                apply_record_count(organization_id, model, delta)
+
+
+def adjust_record_count(organization_id, model, delta, using=None):
+    """Add ``delta`` to the organization's counter for ``model`` once the transaction commits."""
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    batch = getattr(_local, 'batch', None)
+    # Reuse a batch only within the savepoint it was registered in, so a
+    # rolled back savepoint discards exactly its own deltas
+    savepoint_ids = set(connection.savepoint_ids)
+    if batch is not None and any(
+        entry[1] == batch.flush and set(entry[0]) == savepoint_ids
+        for entry in connection.run_on_commit
+    ):
+        batch.deltas[(organization_id, model)] += delta
+        return
+    batch = _local.batch = CountBatch()
+    batch.deltas[(organization_id, model)] += delta
+    transaction.on_commit(batch.flush, using=using)
+
+
+def apply_record_count(organization_id, model, delta):
+    """
+    Add ``delta`` to a stored counter in one autocommit ``UPDATE``.
+
+    A missing counter is initialized with an exact count of the
+    organization's rows on the first insert. Deletes never create one, so
+    cascades from a deleted organization do not recreate its counters.
+    """
+    updated = RecordCounter.objects.filter(
+        organization_id=organization_id, model_label=model_label(model)
+    ).update(count=F('count') + delta, updated_at=timezone.now())
+    if not updated and delta > 0:
+        recount_records(organization_id, model)
+
+
+def recount_records(organization_id, model):
+    """Store an exact count of the organization's ``model`` rows and return it."""
+    count = model._base_manager.filter(organization_id=organization_id).count()
+    now = timezone.now()
+    updated = RecordCounter.objects.filter(
+        organization_id=organization_id, model_label=model_label(model)
+    ).update(count=count, reconciled_at=now, updated_at=now)
+    if not updated:
+        # A concurrent first insert may create the counter; its count is exact too
+        RecordCounter.objects.bulk_create([
+            RecordCounter(organization_id=organization_id, model_label=model_label(model), count=count, reconciled_at=now)
+        ], ignore_conflicts=True)
+    return count
+
+
+def schedule_recount(organization_id, model):
+    """Queue an exact recount of a missing counter, at most once per ``RECOUNT_SCHEDULE_TIMEOUT``."""
+    from .tasks import recount_records_task
+
+    label = model_label(model)
+    if cache.add(f'core:recount-scheduled:{organization_id}:{label}', 1, RECOUNT_SCHEDULE_TIMEOUT):
+        recount_records_task.delay(str(organization_id), label)
+
+
+def record_counts(organization):
+    """
+    Return ``{model_label: count}`` of every tracked model for an organization.
+
+    Models without a counter yet report 0 and get an exact recount queued,
+    so the request never runs ``COUNT(*)`` itself.
+    """
+    counts = dict(
+        RecordCounter.objects.filter(organization=organization).values_list('model_label', 'count')
+    )
+    for model in counted_models:
+        if model_label(model) not in counts:
+            counts[model_label(model)] = 0
+            schedule_recount(organization.pk, model)
+    return {model_label(model): counts[model_label(model)] for model in counted_models}
+
+
+def estimated_table_rows(model):
+    """Planner row estimate of the model's table from ``pg_class``, if available."""
+    connection = connections[model._base_manager.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [model._meta.db_table])
+        row = cursor.fetchone()
+    # reltuples is -1 for tables that were never vacuumed or analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def reconcile_model_counts(model):
+    """
+    Recount ``model`` for every organization with one grouped query.
+
+    Tables the planner estimates above ``EXACT_COUNT_THRESHOLD`` rows are
+    skipped while the counters stay within ``RECOUNT_TOLERANCE`` of the
+    estimate. Returns whether the counters were recounted.
+    """
+    label = model_label(model)
+    estimate = estimated_table_rows(model)
+    if estimate is not None and estimate > EXACT_COUNT_THRESHOLD:
+        tracked = RecordCounter.objects.filter(model_label=label).aggregate(total=Sum('count'))['total'] or 0
+        if abs(tracked - estimate) <= estimate * RECOUNT_TOLERANCE:
+            return False
+
+    now = timezone.now()
+    counts = dict(
+        model._base_manager.order_by().values('organization_id')
+        .annotate(total=Count('pk')).values_list('organization_id', 'total')
+    )
+    counters = list(RecordCounter.objects.filter(model_label=label))
+    for counter in counters:
+        counter.count = counts.pop(counter.organization_id, 0)
+        counter.reconciled_at = now
+        counter.updated_at = now
+    RecordCounter.objects.bulk_update(counters, ['count', 'reconciled_at', 'updated_at'], batch_size=1000)
+    RecordCounter.objects.bulk_create([
+        RecordCounter(organization_id=organization_id, model_label=label, count=count, reconciled_at=now)
+        for organization_id, count in counts.items()
+    ], batch_size=1000, ignore_conflicts=True)
+    return True
+
+
+def reconcile_record_counts():
+    """Reconcile every tracked model; return the labels that were recounted."""
+    return [model_label(model) for model in counted_models if reconcile_model_counts(model)]
@@ -0,0 +1,157 @@
+"""
+Convert the generic relation ``object_id`` columns from text to UUID in place.
+
+A plain ``ALTER COLUMN ... TYPE uuid`` rewrites each table under an
+exclusive lock and fails on the empty ids notifications used to store.
+This command instead:
+
+1. adds a nullable ``object_id_new`` uuid column and a trigger that keeps
+   it in sync with writes made while the command runs;
+2. backfills it with ``NULLIF(object_id, '')::uuid`` in short batches;
+3. builds the ``(content_type_id, object_id_new)`` index concurrently where
+   the model declares one and, for required ids, validates a ``NOT NULL``
+   check without blocking writes;
+4. swaps the columns and indexes in one brief transaction, keeping the old
+   text column as ``object_id_old`` until ``--drop-old`` is passed.
+
+Run it before applying the schema migration that alters ``object_id`` to a
+``UUIDField``, then record that migration with ``migrate --fake``.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.core.models import Activity, Attachment, Note, Notification
+
+MODELS = [Note, Attachment, Activity, Notification]
+
+
+class Command(BaseCommand):
+    help = 'Convert generic relation object_id columns to UUID without rewriting the tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--drop-old', action='store_true',
+            help='Drop the object_id_old columns left by a previous conversion.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This command only supports PostgreSQL.')
+        for model in MODELS:
+            table = model._meta.db_table
+            if options['drop_old']:
+                self.drop_old(table)
+            elif self.column_type(table, 'object_id') == 'uuid':
+                self.stdout.write(f'{table}: object_id is already a uuid column')
+            else:
+                self.convert(model, table, options['batch_size'])
+
+    def column_type(self, table, column):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT data_type FROM information_schema.columns '
+                'WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s',
+                [table, column]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def convert(self, model, table, batch_size):
+        required = not model._meta.get_field('object_id').null
+        # Notifications declare no (content_type, object_id) index
+        index_name = next((
+            index.name for index in model._meta.indexes
+            if list(index.fields) == ['content_type', 'object_id']
+        ), None)
+        function = f'{table}_sync_object_id_new'
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS object_id_new uuid NULL')
+            cursor.execute(f'''
+                CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+                BEGIN
+                    NEW.object_id_new := NULLIF(NEW.object_id, '')::uuid;
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+            ''')
+            cursor.execute(f'DROP TRIGGER IF EXISTS {function} ON {table}')
+            cursor.execute(
+                f'CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OF object_id ON {table} '
+                f'FOR EACH ROW EXECUTE FUNCTION {function}()'
+            )
+
+        backfilled = self.backfill(table, batch_size)
+        self.stdout.write(f'{table}: backfilled {backfilled} rows')
+
+        with connection.cursor() as cursor:
+            if index_name:
+                cursor.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_object_id_new_idx '
+                    f'ON {table} (content_type_id, object_id_new)'
+                )
+            if required:
+                cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE object_id_new IS NULL')
+                missing = cursor.fetchone()[0]
+                if missing:
+                    raise CommandError(
+                        f'{table}: {missing} rows have an empty object_id; '
+                        f'fix or delete them and run the command again.'
+                    )
+                cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_object_id_new_not_null')
+                cursor.execute(
+                    f'ALTER TABLE {table} ADD CONSTRAINT {table}_object_id_new_not_null '
+                    f'CHECK (object_id_new IS NOT NULL) NOT VALID'
+                )
+                cursor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_object_id_new_not_null')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'DROP TRIGGER {function} ON {table}')
+            cursor.execute(f'DROP FUNCTION {function}()')
+            cursor.execute(f'ALTER TABLE {table} RENAME COLUMN object_id TO object_id_old')
+            cursor.execute(f'ALTER TABLE {table} ALTER COLUMN object_id_old DROP NOT NULL')
+            cursor.execute(f'ALTER TABLE {table} RENAME COLUMN object_id_new TO object_id')
+            if required:
+                # Uses the validated check constraint instead of scanning the table
+                cursor.execute(f'ALTER TABLE {table} ALTER COLUMN object_id SET NOT NULL')
+                cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {table}_object_id_new_not_null')
+            if index_name:
+                cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+                cursor.execute(f'ALTER INDEX {table}_object_id_new_idx RENAME TO {index_name}')
+        self.stdout.write(f'{table}: object_id is now a uuid column; the text ids are kept in object_id_old')
+
+    def backfill(self, table, batch_size):
+        """Fill ``object_id_new`` in primary key order, one short transaction per batch."""
+        backfilled = 0
+        last_pk = None
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'''
+                    WITH batch AS (
+                        SELECT id FROM {table}
+                        WHERE (%s::uuid IS NULL OR id > %s::uuid)
+                        ORDER BY id
+                        LIMIT %s
+                    )
+                    UPDATE {table} SET object_id_new = NULLIF({table}.object_id, '')::uuid
+                    FROM batch WHERE {table}.id = batch.id
+                    RETURNING {table}.id
+                    ''',
+                    [last_pk, last_pk, batch_size]
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return backfilled
+            backfilled += len(ids)
+            last_pk = max(ids)
+
+    def drop_old(self, table):
+        if self.column_type(table, 'object_id_old') is None:
+            self.stdout.write(f'{table}: no object_id_old column')
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {table} DROP COLUMN object_id_old')
+        self.stdout.write(f'{table}: dropped object_id_old')
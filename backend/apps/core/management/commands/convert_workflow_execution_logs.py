@@ -0,0 +1,43 @@
+"""
+Convert ``core_workflow_executions.execution_log`` from text to jsonb.
+
+Existing rows store ``''`` or free text, and ``''::jsonb`` fails, so the
+generated ``AlterField`` cannot cast the column. This command converts it
+with an explicit ``USING`` clause: empty logs become ``[]`` and text logs
+become a single ``legacy`` step in the structured format.
+
+Run it before applying the schema migration that alters ``execution_log``
+to a ``JSONField``, then record that migration with ``migrate --fake``.
+Purge old executions first to keep the table rewrite short.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core.models import WorkflowExecution
+
+
+class Command(BaseCommand):
+    help = 'Convert workflow execution logs from text to structured JSON.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This command only supports PostgreSQL.')
+        table = WorkflowExecution._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT data_type FROM information_schema.columns '
+                "WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'execution_log'",
+                [table]
+            )
+            row = cursor.fetchone()
+            if row is None or row[0] == 'jsonb':
+                self.stdout.write(f'{table}: execution_log needs no conversion')
+                return
+            cursor.execute(f'''
+                ALTER TABLE {table} ALTER COLUMN execution_log TYPE jsonb USING
+                CASE WHEN execution_log = '' THEN '[]'::jsonb
+                ELSE jsonb_build_array(jsonb_build_object(
+                    'step', 'log', 'status', 'legacy', 'detail', execution_log, 'duration_ms', 0
+                )) END
+            ''')
+        self.stdout.write(f'{table}: execution_log is now a jsonb column')
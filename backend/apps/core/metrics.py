@@ -0,0 +1,100 @@
+"""
+Request response-time percentiles.
+
+Durations are counted into fixed latency buckets per time window in the
+shared cache, so percentiles cover every worker process. Each process
+buffers its counts and flushes them at most every ``FLUSH_INTERVAL``
+seconds to keep cache traffic off the request path.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets in milliseconds; slower requests
+# fall into a final overflow bucket
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 75, 100, 150, 250, 500, 750, 1000, 2500, 5000, 10000]
+WINDOW_SECONDS = 300
+# Percentiles cover the current window and the ones before it
+WINDOW_COUNT = 3
+FLUSH_INTERVAL = 5
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def _bucket_key(window, index):
+    return f'core:response-time:{window}:{index}'
+
+
+def record_response_time(duration_ms):
+    """Count one request duration, flushing buffered counts when due."""
+    global _last_flush
+    with _lock:
+        _pending[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        now = time.monotonic()
+        if now - _last_flush < FLUSH_INTERVAL:
+            return
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = now
+    try:
+        flush_response_times(pending)
+    except Exception:
+        logger.warning('Could not flush response time samples', exc_info=True)
+
+
+def flush_response_times(pending):
+    """Add ``{bucket_index: count}`` to the current window in the cache."""
+    window = int(time.time() // WINDOW_SECONDS)
+    timeout = WINDOW_SECONDS * (WINDOW_COUNT + 1)
+    for index, count in pending.items():
+        key = _bucket_key(window, index)
+        cache.add(key, 0, timeout)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.set(key, count, timeout)
+
+
+def response_time_percentiles(percentiles=(50, 90, 95, 99)):
+    """
+    Return ``{'sample_count': n, 'p50': ms, ...}`` over the recent windows.
+
+    Each percentile is the upper bound of the bucket it falls in, or
+    ``None`` when no requests were sampled.
+    """
+    window = int(time.time() // WINDOW_SECONDS)
+    bucket_count = len(LATENCY_BUCKETS_MS) + 1
+    keys = {
+        _bucket_key(past, index): index
+        for past in range(window - WINDOW_COUNT + 1, window + 1)
+        for index in range(bucket_count)
+    }
+    counts = [0] * bucket_count
+    for key, value in cache.get_many(list(keys)).items():
+        counts[keys[key]] += value
+
+    total = sum(counts)
+    result = {'sample_count': total}
+    for percentile in percentiles:
+        result[f'p{percentile}'] = _bucket_percentile(counts, total, percentile)
+    return result
+
+
+def _bucket_percentile(counts, total, percentile):
+    if not total:
+        return None
+    rank = total * percentile / 100
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= rank:
+            return LATENCY_BUCKETS_MS[min(index, len(LATENCY_BUCKETS_MS) - 1)]
+    return LATENCY_BUCKETS_MS[-1]
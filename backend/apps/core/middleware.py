@@ -0,0 +1,19 @@
+"""
+Middleware for core module.
+"""
+import time
+
+from .metrics import record_response_time
+
+
+class ResponseTimeMiddleware:
+    """Sample the response time of every request for the dashboard."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        record_response_time((time.perf_counter() - started) * 1000)
+        return response
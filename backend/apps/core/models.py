@@ -3,7 +3,7 @@ Core models for the ERP system.
 """
 from django.db import models
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.utils import timezone
 import uuid
 
@@ -62,7 +62,7 @@ class Note(BaseModel):
     
     # Generic foreign key to attach notes to any model
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.CharField(max_length=100)
+    object_id = models.UUIDField()
     content_object = GenericForeignKey('content_type', 'object_id')
     
     class Meta:
@@ -86,7 +86,7 @@ class Attachment(BaseModel):
     
     # Generic foreign key to attach files to any model
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.CharField(max_length=100)
+    object_id = models.UUIDField()
     content_object = GenericForeignKey('content_type', 'object_id')
     
     class Meta:
@@ -125,6 +125,9 @@ class Activity(BaseModel):
         ('overdue', 'Overdue'),
     ]
     
+    # Statuses of activities that still need to happen
+    OPEN_STATUSES = ['planned', 'in_progress']
+    
     PRIORITY_CHOICES = [
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -152,7 +155,7 @@ class Activity(BaseModel):
     
     # Generic foreign key to link activities to any model
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.CharField(max_length=100)
+    object_id = models.UUIDField()
     content_object = GenericForeignKey('content_type', 'object_id')
     
     class Meta:
@@ -162,6 +165,12 @@ class Activity(BaseModel):
             models.Index(fields=['assigned_to', 'scheduled_date']),
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['status', 'scheduled_date']),
+            models.Index(fields=['organization', 'assigned_to', 'scheduled_date']),
+            models.Index(
+                fields=['organization', 'scheduled_date'],
+                name='core_activity_open_sched_idx',
+                condition=models.Q(status__in=['planned', 'in_progress'])
+            ),
         ]
     
     def __str__(self):
@@ -170,7 +179,7 @@ class Activity(BaseModel):
     @property
     def is_overdue(self):
         return (
-            self.status in ['planned', 'in_progress'] and 
+            self.status in self.OPEN_STATUSES and 
             self.scheduled_date < timezone.now()
         )
     
@@ -180,6 +189,23 @@ class Activity(BaseModel):
         self.save()
 
 
+class RelatedObjectsModel(models.Model):
+    """Abstract model exposing the notes, attachments and activities of a record.
+    
+    The generic relations join on the UUID ``object_id`` so they can be
+    used with ``prefetch_related`` and in annotations. Deleting a record
+    deletes its notes, attachments and activities with it, rather than
+    leaving rows that point at a missing object.
+    """
+    
+    related_notes = GenericRelation(Note)
+    related_attachments = GenericRelation(Attachment)
+    related_activities = GenericRelation(Activity)
+    
+    class Meta:
+        abstract = True
+
+
 class Dashboard(BaseModel):
     """Dashboard model for custom dashboards."""
     
@@ -282,13 +308,17 @@ class WorkflowExecution(BaseModel):
     workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='executions')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     trigger_data = models.JSONField(default=dict)
-    execution_log = models.TextField(blank=True)
+    # Capped list of steps with timings, written once when the run ends
+    execution_log = models.JSONField(default=list, blank=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'core_workflow_executions'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.workflow.name} - {self.status}"
@@ -334,7 +364,7 @@ class Notification(BaseModel):
     
     # Optional link to related object
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
-    object_id = models.CharField(max_length=100, blank=True)
+    object_id = models.UUIDField(null=True, blank=True)
     content_object = GenericForeignKey('content_type', 'object_id')
     
     class Meta:
@@ -354,6 +384,22 @@ class Notification(BaseModel):
             self.save()
 
 
+class RecordCounter(BaseModel):
+    """Maintained row count of one model for an organization."""
+    
+    model_label = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'core_record_counters'
+        unique_together = ['organization', 'model_label']
+        ordering = ['model_label']
+    
+    def __str__(self):
+        return f"{self.model_label}: {self.count}"
+
+
 class SystemLog(models.Model):
     """System log for tracking system events."""
     
@@ -0,0 +1,170 @@
+"""
+Cached organization settings.
+
+All ``Setting`` rows of an organization are loaded with one query and kept
+in a process-local LRU. Every save or delete of a setting replaces the
+organization's version token in the shared cache once the transaction
+commits. Processes compare their copy's token at most every
+``SETTINGS_CHECK_INTERVAL`` seconds, so steady-state reads cost no
+queries; changes made in the current process apply immediately.
+
+Usage::
+
+    settings = organization_settings(request.user.organization_id)
+    settings.get_int('invoice_due_days', 30)
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Setting
+
+SETTINGS_VERSION_TIMEOUT = 60 * 60 * 24 * 30
+SETTINGS_CHECK_INTERVAL = 5
+# Organizations whose settings are kept per process
+SETTINGS_CACHE_SIZE = 500
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', ''}
+
+_missing = object()
+
+
+def settings_version_key(organization_id):
+    return f'core:settings-version:{organization_id}'
+
+
+def _instance_of(kind):
+    def convert(value):
+        if not isinstance(value, kind):
+            raise TypeError(value)
+        return value
+    return convert
+
+
+class OrganizationSettings:
+    """Read-only view of one organization's settings with typed accessors."""
+
+    def __init__(self, organization_id, values, public_keys):
+        self.organization_id = organization_id
+        self.values = values
+        self.public_keys = public_keys
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def _typed(self, key, default, convert):
+        value = self.values.get(key, _missing)
+        if value is _missing or value is None:
+            return default
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, key, default=False):
+        def convert(value):
+            if isinstance(value, bool):
+                return value
+            if str(value).strip().lower() in TRUE_VALUES:
+                return True
+            if str(value).strip().lower() in FALSE_VALUES:
+                return False
+            raise ValueError(value)
+        return self._typed(key, default, convert)
+
+    def get_int(self, key, default=0):
+        return self._typed(key, default, lambda value: int(str(value).strip()))
+
+    def get_float(self, key, default=0.0):
+        return self._typed(key, default, lambda value: float(str(value).strip()))
+
+    def get_str(self, key, default=''):
+        return self._typed(key, default, lambda value: value if isinstance(value, str) else str(value))
+
+    def get_list(self, key, default=None):
+        return self._typed(key, [] if default is None else default, _instance_of(list))
+
+    def get_dict(self, key, default=None):
+        return self._typed(key, {} if default is None else default, _instance_of(dict))
+
+    def as_dict(self, public_only=False):
+        if not public_only:
+            return dict(self.values)
+        return {key: value for key, value in self.values.items() if key in self.public_keys}
+
+
+class SettingsCache:
+    """Process-local LRU of ``(version, next_check, OrganizationSettings)`` by organization."""
+
+    def __init__(self, size=SETTINGS_CACHE_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def evict(self, organization_id):
+        with self.lock:
+            self.entries.pop(organization_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _load(self, organization_id):
+        values, public_keys = {}, set()
+        for key, value, is_public in Setting.objects.filter(
+            organization_id=organization_id
+        ).values_list('key', 'value', 'is_public'):
+            values[key] = value
+            if is_public:
+                public_keys.add(key)
+        return OrganizationSettings(organization_id, values, frozenset(public_keys))
+
+    def get(self, organization_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(organization_id)
+            if entry is not None:
+                self.entries.move_to_end(organization_id)
+        if entry is not None and now < entry[1]:
+            return entry[2]
+
+        version = cache.get_or_set(
+            settings_version_key(organization_id), lambda: uuid.uuid4().hex, SETTINGS_VERSION_TIMEOUT
+        )
+        if entry is not None and entry[0] == version:
+            settings = entry[2]
+        else:
+            settings = self._load(organization_id)
+        with self.lock:
+            self.entries[organization_id] = (version, now + SETTINGS_CHECK_INTERVAL, settings)
+            self.entries.move_to_end(organization_id)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return settings
+
+
+settings_cache = SettingsCache()
+
+
+def organization_settings(organization_id):
+    """Return the cached settings of an organization."""
+    return settings_cache.get(organization_id)
+
+
+def invalidate_organization_settings(organization_id):
+    """Drop cached settings of an organization here now and everywhere on commit."""
+    settings_cache.evict(organization_id)
+
+    def bump():
+        cache.set(settings_version_key(organization_id), uuid.uuid4().hex, SETTINGS_VERSION_TIMEOUT)
+        settings_cache.evict(organization_id)
+
+    transaction.on_commit(bump)
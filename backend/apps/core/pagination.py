@@ -0,0 +1,19 @@
+"""
+Shared pagination classes.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Cursor pagination for large per-user lists, newest first.
+
+    Pages are fetched with a keyset ``WHERE created_at < cursor`` instead of
+    ``OFFSET``, so deep pages cost the same as the first one when an index
+    ends in ``created_at``.
+    """
+
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-created_at'
@@ -0,0 +1,148 @@
+"""
+Building blocks for queries declared in JSON configs (dashboard widgets
+and reports).
+
+Only models registered with ``register_query_model`` can be queried, and
+only through their concrete fields with a small set of lookups. Every
+write to a registered model bumps a per-organization data version, which
+callers embed in their cache keys.
+"""
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import (
+    Avg, Count, DateField, DecimalField, DurationField, FloatField, IntegerField, Max, Min, Sum
+)
+from django.db.models.signals import post_delete, post_save
+
+DATA_VERSION_TIMEOUT = 60 * 60 * 24
+
+AGGREGATES = {'count': Count, 'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+TIME_BUCKETS = ['day', 'week', 'month', 'quarter', 'year']
+FILTER_LOOKUPS = ['exact', 'in', 'gt', 'gte', 'lt', 'lte', 'isnull', 'range']
+# Aggregates that only make sense over numbers
+NUMERIC_AGGREGATES = {'sum', 'avg'}
+NUMERIC_FIELDS = (IntegerField, DecimalField, FloatField, DurationField)
+# DateTimeField is a DateField subclass
+TIME_BUCKET_FIELDS = (DateField,)
+
+query_models = {}
+
+
+class QueryConfigError(ValueError):
+    """Raised for widget or report configs that cannot be compiled."""
+
+
+def register_query_model(model):
+    """Allow configs to query ``model`` and version its data on writes."""
+    label = model._meta.label_lower
+    if label in query_models:
+        return
+    query_models[label] = model
+    post_save.connect(bump_data_version, sender=model, dispatch_uid=f'data-version-save:{label}')
+    post_delete.connect(bump_data_version, sender=model, dispatch_uid=f'data-version-delete:{label}')
+
+
+def data_version_key(organization_id, label):
+    return f'core:data-version:{organization_id}:{label}'
+
+
+def bump_data_version(sender, instance, **kwargs):
+    key = data_version_key(instance.organization_id, sender._meta.label_lower)
+    if not cache.add(key, 1, DATA_VERSION_TIMEOUT):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, DATA_VERSION_TIMEOUT)
+
+
+def data_version(organization_id, model):
+    return cache.get(data_version_key(organization_id, model._meta.label_lower), 0)
+
+
+def query_model(config):
+    """Return the registered model named by ``config['model']``."""
+    if not isinstance(config, dict):
+        raise QueryConfigError('Config must be an object.')
+    model = query_models.get(str(config.get('model', '')).lower())
+    if model is None:
+        raise QueryConfigError(f'Unsupported model "{config.get("model")}".')
+    return model
+
+
+def field_name(model, name, role, field_types=None, kind=None):
+    """
+    Return the column attribute of a concrete ``model`` field used as ``role``.
+
+    ``field_types`` restricts the field to instances of the given classes,
+    described as ``kind`` in errors.
+    """
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise QueryConfigError(f'Unknown {role} field "{name}".')
+    if not field.concrete or field.many_to_many:
+        raise QueryConfigError(f'Field "{name}" cannot be used as {role}.')
+    if field_types and not isinstance(field, field_types):
+        raise QueryConfigError(f'Field "{name}" must be a {kind} field to be used as {role}.')
+    return field.attname
+
+
+def parse_measure(model, measure):
+    """Return ``(aggregate, field)`` for a ``{"aggregate", "field"}`` measure."""
+    measure = measure or {'aggregate': 'count'}
+    if not isinstance(measure, dict):
+        raise QueryConfigError('Measure must be an object.')
+    aggregate = measure.get('aggregate', 'count')
+    if aggregate not in AGGREGATES:
+        raise QueryConfigError(f'Unsupported aggregate "{aggregate}".')
+    field = measure.get('field')
+    if aggregate != 'count' and not field:
+        raise QueryConfigError(f'The "{aggregate}" aggregate needs a field.')
+    if not field:
+        return aggregate, 'pk'
+    if aggregate in NUMERIC_AGGREGATES:
+        return aggregate, field_name(model, field, 'measure', NUMERIC_FIELDS, 'numeric')
+    return aggregate, field_name(model, field, 'measure')
+
+
+def parse_filters(model, filters):
+    """Return ORM filter kwargs for a ``{"field__lookup": value}`` mapping."""
+    filters = filters or {}
+    if not isinstance(filters, dict):
+        raise QueryConfigError('Filters must be an object.')
+    parsed = {}
+    for key, value in filters.items():
+        name, _, lookup = key.partition('__')
+        if (lookup or 'exact') not in FILTER_LOOKUPS:
+            raise QueryConfigError(f'Unsupported filter lookup "{lookup}".')
+        parsed[f'{field_name(model, name, "filter")}__{lookup or "exact"}'] = value
+    return parsed
+
+
+def parse_time_bucket(model, time_bucket):
+    """Return ``{"field", "interval"}`` for a time bucket, or ``None``."""
+    if not time_bucket:
+        return None
+    if not isinstance(time_bucket, dict):
+        raise QueryConfigError('Time bucket must be an object.')
+    if time_bucket.get('interval') not in TIME_BUCKETS:
+        raise QueryConfigError(f'Unsupported time bucket "{time_bucket.get("interval")}".')
+    return {
+        'field': field_name(model, time_bucket.get('field', ''), 'time bucket', TIME_BUCKET_FIELDS, 'date'),
+        'interval': time_bucket['interval'],
+    }
+
+
+def parse_limit(value, default, maximum):
+    try:
+        return max(min(int(default if value is None else value), maximum), 1)
+    except (TypeError, ValueError):
+        raise QueryConfigError('Limit must be a number.')
+
+
+def filtered_queryset(model, organization_id, filters):
+    """The organization's rows of ``model`` matching parsed ``filters``."""
+    try:
+        return model.objects.filter(organization_id=organization_id, **filters)
+    except (TypeError, ValueError, ValidationError) as exc:
+        raise QueryConfigError(f'Invalid filter value: {exc}')
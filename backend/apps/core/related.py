@@ -0,0 +1,57 @@
+"""
+Batched lookups of the notes, attachments and activities attached to
+records through their generic ``(content_type, object_id)`` relation.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Q
+
+from .models import Activity, Attachment, Note
+
+RELATED_MODELS = [
+    ('notes', Note, ['created_by']),
+    ('attachments', Attachment, ['created_by']),
+    ('activities', Activity, ['assigned_to', 'created_by']),
+]
+MAX_RELATED_BATCH_SIZE = 200
+
+
+def _pairs_filter(pairs):
+    object_ids = defaultdict(set)
+    for content_type_id, object_id in pairs:
+        object_ids[content_type_id].add(object_id)
+    return reduce(or_, (
+        Q(content_type_id=content_type_id, object_id__in=ids)
+        for content_type_id, ids in object_ids.items()
+    ))
+
+
+def related_objects(organization, pairs, counts_only=False):
+    """
+    Return ``{(content_type_id, object_id): {'notes': ..., 'attachments': ...,
+    'activities': ...}}`` for every requested pair with one query per
+    related model.
+
+    With ``counts_only`` each entry holds counts instead of model instances.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    results = {
+        pair: {name: 0 if counts_only else [] for name, model, related in RELATED_MODELS}
+        for pair in pairs
+    }
+    if not pairs:
+        return results
+
+    pairs_filter = _pairs_filter(pairs)
+    for name, model, related in RELATED_MODELS:
+        queryset = model.objects.filter(pairs_filter, organization=organization)
+        if counts_only:
+            rows = queryset.order_by().values('content_type_id', 'object_id').annotate(total=Count('id'))
+            for row in rows:
+                results[(row['content_type_id'], row['object_id'])][name] = row['total']
+        else:
+            for item in queryset.select_related(*related):
+                results[(item.content_type_id, item.object_id)][name].append(item)
+    return results
@@ -0,0 +1,236 @@
+"""
+Report execution.
+
+A report ``config`` compiles to one ORM query over a registered model
+(see ``apps.core.queries``):
+
+* rows: ``{"model", "columns", "filters", "order_by", "limit"}``
+* aggregates: ``{"model", "group_by", "time_bucket", "measures", "filters"}``
+* pivots (``report_type == 'pivot'``): ``{"model", "group_by", "pivot":
+  {"field", "values"}, "measure", "filters"}``. Each pivot column is a
+  conditional aggregate, so the pivot is computed by the database in
+  a single grouped query.
+
+Results are cached under a hash of the config, the organization and the
+model's data version. Background runs are tracked per report, so polling
+a report reuses its pending run instead of queueing another. ``stream_report_csv`` bypasses the row limit and
+streams every row from a server-side iterator.
+"""
+import csv
+import hashlib
+import json
+import uuid
+
+from celery.result import AsyncResult
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Trunc
+
+from .queries import (
+    AGGREGATES, QueryConfigError, data_version, field_name, filtered_queryset,
+    parse_filters, parse_limit, parse_measure, parse_time_bucket, query_model
+)
+
+REPORT_CACHE_TIMEOUT = 60 * 30
+DEFAULT_REPORT_ROW_LIMIT = 1000
+MAX_REPORT_ROW_LIMIT = 10000
+MAX_PIVOT_COLUMNS = 50
+CSV_CHUNK_SIZE = 2000
+
+
+def _field_list(model, names, role):
+    if isinstance(names, str):
+        names = [names]
+    if not isinstance(names, list):
+        raise QueryConfigError(f'{role.capitalize()} must be a list of fields.')
+    return [field_name(model, name, role) for name in names]
+
+
+def _ordering(model, names):
+    if isinstance(names, str):
+        names = [names]
+    if not isinstance(names, list):
+        raise QueryConfigError('Order by must be a list of fields.')
+    ordering = []
+    for name in names:
+        column = field_name(model, str(name).lstrip('-'), 'order by')
+        ordering.append(f'-{column}' if str(name).startswith('-') else column)
+    return ordering
+
+
+def parse_report_config(report_type, config):
+    """Validate a report config and return it in normalized form."""
+    model = query_model(config)
+    spec = {
+        'model': model,
+        'filters': parse_filters(model, config.get('filters')),
+        'time_bucket': parse_time_bucket(model, config.get('time_bucket')),
+        'group_by': _field_list(model, config.get('group_by') or [], 'group by'),
+        'limit': parse_limit(config.get('limit'), DEFAULT_REPORT_ROW_LIMIT, MAX_REPORT_ROW_LIMIT),
+    }
+
+    if report_type == 'pivot':
+        pivot = config.get('pivot')
+        if not isinstance(pivot, dict) or not pivot.get('field'):
+            raise QueryConfigError('Pivot reports need a pivot field.')
+        values = pivot.get('values')
+        if values is not None and (not isinstance(values, list) or len(values) > MAX_PIVOT_COLUMNS):
+            raise QueryConfigError(f'Pivot values must be a list of at most {MAX_PIVOT_COLUMNS} items.')
+        if not spec['group_by'] and not spec['time_bucket']:
+            raise QueryConfigError('Pivot reports need a group by field or time bucket.')
+        spec['kind'] = 'pivot'
+        spec['pivot_field'] = field_name(model, pivot['field'], 'pivot')
+        spec['pivot_values'] = values
+        spec['measure'] = parse_measure(model, config.get('measure'))
+    elif spec['group_by'] or spec['time_bucket'] or config.get('measures'):
+        measures = config.get('measures') or [{'aggregate': 'count'}]
+        if not isinstance(measures, list):
+            raise QueryConfigError('Measures must be a list.')
+        spec['kind'] = 'aggregate'
+        spec['measures'] = []
+        for measure in measures:
+            aggregate, field = parse_measure(model, measure)
+            name = measure.get('name') or (f'{aggregate}_{field}' if field != 'pk' else aggregate)
+            spec['measures'].append((str(name), aggregate, field))
+    else:
+        spec['kind'] = 'rows'
+        spec['columns'] = _field_list(model, config.get('columns') or ['id'], 'column')
+        spec['ordering'] = _ordering(model, config.get('order_by'))
+    return spec
+
+
+def _group_keys(spec):
+    return (['bucket'] if spec['time_bucket'] else []) + spec['group_by']
+
+
+def _grouped(queryset, spec):
+    if spec['time_bucket']:
+        queryset = queryset.annotate(
+            bucket=Trunc(spec['time_bucket']['field'], spec['time_bucket']['interval'])
+        )
+    return queryset.order_by().values(*_group_keys(spec))
+
+
+def build_report_query(organization_id, spec):
+    """Return ``(columns, queryset)`` where the queryset yields row tuples."""
+    queryset = filtered_queryset(spec['model'], organization_id, spec['filters'])
+
+    if spec['kind'] == 'rows':
+        return spec['columns'], queryset.order_by(*spec['ordering'] or ['pk']).values_list(*spec['columns'])
+
+    keys = _group_keys(spec)
+    if spec['kind'] == 'aggregate':
+        annotations = {
+            f'm{index}': AGGREGATES[aggregate](field)
+            for index, (name, aggregate, field) in enumerate(spec['measures'])
+        }
+        columns = keys + [name for name, aggregate, field in spec['measures']]
+    else:
+        values = spec['pivot_values']
+        if values is None:
+            values = list(
+                queryset.order_by(spec['pivot_field']).values_list(spec['pivot_field'], flat=True)
+                .distinct()[:MAX_PIVOT_COLUMNS]
+            )
+        aggregate, field = spec['measure']
+        annotations = {
+            f'm{index}': AGGREGATES[aggregate](field, filter=Q(**{spec['pivot_field']: value}))
+            for index, value in enumerate(values)
+        }
+        annotations[f'm{len(values)}'] = AGGREGATES[aggregate](field)
+        columns = keys + ['' if value is None else str(value) for value in values] + ['total']
+
+    queryset = _grouped(queryset, spec).annotate(**annotations).order_by(*keys)
+    return columns, queryset.values_list(*keys, *annotations)
+
+
+def report_cache_key(report):
+    model = query_model(report.config)
+    payload = json.dumps(
+        [report.report_type, report.config, str(report.organization_id), data_version(report.organization_id, model)],
+        sort_keys=True, default=str
+    )
+    return f'core:report:{hashlib.sha256(payload.encode()).hexdigest()}'
+
+
+def execute_report(report):
+    """Run a report and return ``{'columns', 'rows', 'row_count', 'truncated'}``."""
+    spec = parse_report_config(report.report_type, report.config)
+    columns, queryset = build_report_query(report.organization_id, spec)
+    rows = [list(row) for row in queryset[:spec['limit'] + 1]]
+    truncated = len(rows) > spec['limit']
+    rows = rows[:spec['limit']]
+    return {'columns': columns, 'rows': rows, 'row_count': len(rows), 'truncated': truncated}
+
+
+def cached_report_result(report):
+    return cache.get(report_cache_key(report))
+
+
+def report_job_key(report):
+    return f'core:report-job:{report.pk}'
+
+
+def report_job(report):
+    """Return ``{'task_id', 'result_key'}`` of the report's last background run, or ``None``."""
+    return cache.get(report_job_key(report))
+
+
+def queue_report_run(report):
+    """
+    Queue a background run of ``report`` and return its task id.
+
+    A run queued for the same data that has not finished yet is reused.
+    """
+    from .tasks import run_report_task
+
+    job_key = report_job_key(report)
+    result_key = report_cache_key(report)
+    job = cache.get(job_key)
+    if job is not None and job['result_key'] == result_key and not AsyncResult(job['task_id']).ready():
+        return job['task_id']
+
+    new_job = {'task_id': str(uuid.uuid4()), 'result_key': result_key}
+    if job is None:
+        if not cache.add(job_key, new_job, REPORT_CACHE_TIMEOUT):
+            # A concurrent request queued a run first
+            return (cache.get(job_key) or new_job)['task_id']
+    else:
+        cache.set(job_key, new_job, REPORT_CACHE_TIMEOUT)
+    run_report_task.apply_async([str(report.pk)], task_id=new_job['task_id'])
+    return new_job['task_id']
+
+
+def run_report(report):
+    """Return the cached result of a report, executing it on a miss."""
+    key = report_cache_key(report)
+    result = cache.get(key)
+    if result is None:
+        result = execute_report(report)
+        cache.set(key, result, REPORT_CACHE_TIMEOUT)
+    return result
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for streaming CSV."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns, queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in queryset.iterator(chunk_size=CSV_CHUNK_SIZE):
+        yield writer.writerow(row)
+
+
+def stream_report_csv(report):
+    """
+    Return an iterator of CSV lines over every row of a report, header first.
+
+    The config is compiled eagerly so errors surface before streaming starts.
+    """
+    spec = parse_report_config(report.report_type, report.config)
+    columns, queryset = build_report_query(report.organization_id, spec)
+    return _csv_lines(columns, queryset)
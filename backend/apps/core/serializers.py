@@ -7,6 +7,11 @@ from .models import (
     Tag, Note, Attachment, Activity, Dashboard, Widget, Report,
     Workflow, WorkflowExecution, Setting, Notification
 )
+from .related import MAX_RELATED_BATCH_SIZE, related_objects
+from .reports import parse_report_config
+from .queries import QueryConfigError
+from .widgets import parse_widget_config
+from .workflows import WorkflowConfigError, compile_workflow
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -89,6 +94,15 @@ class WidgetSerializer(serializers.ModelSerializer):
             'width', 'height', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_config(self, value):
+        # Widgets backed by a model must compile to an aggregate query
+        if isinstance(value, dict) and value.get('model'):
+            try:
+                parse_widget_config(value)
+            except QueryConfigError as exc:
+                raise serializers.ValidationError(str(exc))
+        return value
 
 
 class DashboardSerializer(serializers.ModelSerializer):
@@ -120,6 +134,17 @@ class ReportSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        report_type = attrs.get('report_type', getattr(self.instance, 'report_type', None))
+        config = attrs.get('config', getattr(self.instance, 'config', None))
+        # Reports that query a model must compile before they are saved
+        if isinstance(config, dict) and config.get('model'):
+            try:
+                parse_report_config(report_type, config)
+            except QueryConfigError as exc:
+                raise serializers.ValidationError({'config': str(exc)})
+        return attrs
 
 
 class WorkflowSerializer(serializers.ModelSerializer):
@@ -139,6 +164,18 @@ class WorkflowSerializer(serializers.ModelSerializer):
     
     def get_execution_count(self, obj):
         return obj.executions.count()
+    
+    def validate(self, attrs):
+        workflow = Workflow(**{
+            name: attrs.get(name, getattr(self.instance, name, None))
+            for name in ('trigger_model', 'trigger_condition', 'actions')
+        })
+        # Workflows must compile before they are saved, or they never run
+        try:
+            compile_workflow(workflow)
+        except WorkflowConfigError as exc:
+            raise serializers.ValidationError(str(exc))
+        return attrs
 
 
 class WorkflowExecutionSerializer(serializers.ModelSerializer):
@@ -195,6 +232,9 @@ class ActivitySummarySerializer(serializers.Serializer):
     overdue_activities = serializers.IntegerField()
     upcoming_activities = serializers.IntegerField()
     completion_rate = serializers.FloatField()
+    by_type = serializers.DictField(child=serializers.IntegerField())
+    by_priority = serializers.DictField(child=serializers.IntegerField())
+    as_of = serializers.DateTimeField()
 
 
 class DashboardStatsSerializer(serializers.Serializer):
@@ -203,6 +243,7 @@ class DashboardStatsSerializer(serializers.Serializer):
     total_users = serializers.IntegerField()
     active_users = serializers.IntegerField()
     total_records = serializers.IntegerField()
+    record_counts = serializers.DictField(child=serializers.IntegerField())
     recent_activities = ActivitySerializer(many=True)
     unread_notifications = serializers.IntegerField()
     system_health = serializers.DictField()
@@ -217,32 +258,26 @@ class GenericRelatedObjectSerializer(serializers.Serializer):
     
     def to_representation(self, instance):
         """Get related objects for any model instance."""
-        from django.contrib.contenttypes.models import ContentType
-        
-        content_type = ContentType.objects.get_for_model(instance)
-        object_id = str(instance.pk)
-        
-        # Get related objects
-        notes = Note.objects.filter(
-            content_type=content_type,
-            object_id=object_id,
-            organization=instance.organization
-        ).select_related('created_by')
-        
-        attachments = Attachment.objects.filter(
-            content_type=content_type,
-            object_id=object_id,
-            organization=instance.organization
-        ).select_related('created_by')
-        
-        activities = Activity.objects.filter(
-            content_type=content_type,
-            object_id=object_id,
-            organization=instance.organization
-        ).select_related('assigned_to', 'created_by')
-        
+        pair = (ContentType.objects.get_for_model(instance).pk, instance.pk)
+        related = related_objects(instance.organization, [pair])[pair]
         return {
-            'notes': NoteSerializer(notes, many=True).data,
-            'attachments': AttachmentSerializer(attachments, many=True).data,
-            'activities': ActivitySerializer(activities, many=True).data,
+            'notes': NoteSerializer(related['notes'], many=True).data,
+            'attachments': AttachmentSerializer(related['attachments'], many=True).data,
+            'activities': ActivitySerializer(related['activities'], many=True).data,
         }
+
+
+class RelatedObjectReferenceSerializer(serializers.Serializer):
+    """A ``(content_type, object_id)`` pair in a batch related-objects request."""
+    
+    content_type = serializers.IntegerField(min_value=1)
+    object_id = serializers.UUIDField()
+
+
+class RelatedObjectBatchRequestSerializer(serializers.Serializer):
+    """Validate the objects of a batch related-objects request."""
+    
+    objects = RelatedObjectReferenceSerializer(
+        many=True, allow_empty=False, max_length=MAX_RELATED_BATCH_SIZE
+    )
+    counts_only = serializers.BooleanField(default=False)
@@ -0,0 +1,24 @@
+"""
+Signal handlers for core module.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Setting, Workflow
+from .organization_settings import invalidate_organization_settings
+from .workflows import bump_workflow_index, dispatch_workflows
+
+
+post_save.connect(dispatch_workflows, dispatch_uid='core-dispatch-workflows')
+
+
+@receiver([post_save, post_delete], sender=Workflow)
+def refresh_workflow_index(sender, instance, **kwargs):
+    """Recompile the workflow index when a workflow changes."""
+    bump_workflow_index()
+
+
+@receiver([post_save, post_delete], sender=Setting)
+def invalidate_settings_on_write(sender, instance, **kwargs):
+    """Drop the cached settings of the setting's organization."""
+    invalidate_organization_settings(instance.organization_id)
@@ -0,0 +1,48 @@
+"""
+Background tasks for core module.
+"""
+from celery import shared_task
+from django.apps import apps
+
+from .counters import reconcile_record_counts, recount_records
+from .models import Report
+from .reports import run_report
+from .workflows import purge_workflow_executions, run_workflow_executions
+
+
+@shared_task
+def reconcile_record_counts_task():
+    """Correct record counter drift left by bulk writes."""
+    return reconcile_record_counts()
+
+
+@shared_task
+def recount_records_task(organization_id, model_label):
+    """Create or correct one organization's counter for a tracked model."""
+    return recount_records(organization_id, apps.get_model(model_label))
+
+
+@shared_task
+def run_report_task(report_id):
+    """Execute a report in the background and cache its result."""
+    report = Report.objects.filter(pk=report_id).first()
+    if report is None:
+        return None
+    result = run_report(report)
+    return {
+        'organization_id': str(report.organization_id),
+        'report_id': str(report.pk),
+        'row_count': result['row_count'],
+    }
+
+
+@shared_task
+def run_workflow_executions_task(execution_ids):
+    """Run the actions of workflow executions recorded on commit."""
+    return run_workflow_executions(execution_ids)
+
+
+@shared_task
+def purge_workflow_executions_task():
+    """Delete finished and stale workflow executions past their retention periods."""
+    return purge_workflow_executions()
@@ -24,10 +24,22 @@ urlpatterns = [
     path('activities/<uuid:pk>/', views.ActivityDetailView.as_view(), name='activity_detail'),
     path('activities/<uuid:pk>/complete/', views.complete_activity_view, name='complete_activity'),
     path('activities/summary/', views.activity_summary_view, name='activity_summary'),
+    path('activities/overdue/', views.OverdueActivityListView.as_view(), name='overdue_activities'),
     
     # Dashboards
     path('dashboards/', views.DashboardListCreateView.as_view(), name='dashboard_list_create'),
     path('dashboards/<uuid:pk>/', views.DashboardDetailView.as_view(), name='dashboard_detail'),
+    path('dashboards/<uuid:pk>/data/', views.dashboard_widget_data_view, name='dashboard_widget_data'),
+    
+    # Reports
+    path('reports/', views.ReportListCreateView.as_view(), name='report_list_create'),
+    path('reports/<uuid:pk>/', views.ReportDetailView.as_view(), name='report_detail'),
+    path('reports/<uuid:pk>/run/', views.run_report_view, name='run_report'),
+    path('reports/<uuid:pk>/result/', views.report_result_view, name='report_result'),
+    path('reports/<uuid:pk>/export/', views.export_report_csv_view, name='export_report_csv'),
+    
+    # Settings
+    path('settings/', views.organization_settings_view, name='organization_settings'),
     
     # Notifications
     path('notifications/', views.NotificationListView.as_view(), name='notification_list'),
@@ -39,4 +51,5 @@ urlpatterns = [
     
     # Related Objects
     path('related-objects/', views.related_objects_view, name='related_objects'),
+    path('related-objects/batch/', views.related_objects_batch_view, name='related_objects_batch'),
 ]
@@ -4,10 +4,23 @@ Views for core module.
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from celery.result import AsyncResult
 from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.text import slugify
 from django.utils import timezone
 from datetime import timedelta
+import uuid
 from django.contrib.contenttypes.models import ContentType
+from .activities import get_activity_summary, overdue_activities
+from .counters import record_counts
+from .metrics import response_time_percentiles
+from .organization_settings import organization_settings
+from .queries import QueryConfigError
+from .related import related_objects
+from .reports import cached_report_result, queue_report_run, report_job, stream_report_csv
+from .widgets import dashboard_widget_data
 from .models import (
     Tag, Note, Attachment, Activity, Dashboard, Widget, Report,
     Workflow, WorkflowExecution, Setting, Notification
@@ -17,9 +30,24 @@ from .serializers import (
     DashboardSerializer, WidgetSerializer, ReportSerializer,
     WorkflowSerializer, WorkflowExecutionSerializer, SettingSerializer,
     NotificationSerializer, ActivitySummarySerializer, DashboardStatsSerializer,
-    GenericRelatedObjectSerializer
+    GenericRelatedObjectSerializer, RelatedObjectBatchRequestSerializer
 )
 
+# 95th percentile response time above which the system is reported degraded
+DEGRADED_RESPONSE_TIME_MS = 1000
+
+
+def filter_by_related_object(queryset, params):
+    """Restrict a generic relation queryset to the ``content_type``/``object_id`` params."""
+    content_type_id = params.get('content_type')
+    object_id = params.get('object_id')
+    if not content_type_id or not object_id:
+        return queryset
+    try:
+        return queryset.filter(content_type_id=int(content_type_id), object_id=uuid.UUID(object_id))
+    except ValueError:
+        return queryset.none()
+
 
 class TagListCreateView(generics.ListCreateAPIView):
     """List and create tags."""
@@ -57,11 +85,7 @@ class NoteListCreateView(generics.ListCreateAPIView):
         queryset = Note.objects.filter(organization=self.request.user.organization)
         
         # Filter by content type and object id if provided
-        content_type_id = self.request.query_params.get('content_type')
-        object_id = self.request.query_params.get('object_id')
-        
-        if content_type_id and object_id:
-            queryset = queryset.filter(content_type_id=content_type_id, object_id=object_id)
+        queryset = filter_by_related_object(queryset, self.request.query_params)
         
         # Filter private notes
         if not self.request.user.has_organization_permission('view_all_notes'):
@@ -106,11 +130,7 @@ class AttachmentListCreateView(generics.ListCreateAPIView):
         queryset = Attachment.objects.filter(organization=self.request.user.organization)
         
         # Filter by content type and object id if provided
-        content_type_id = self.request.query_params.get('content_type')
-        object_id = self.request.query_params.get('object_id')
-        
-        if content_type_id and object_id:
-            queryset = queryset.filter(content_type_id=content_type_id, object_id=object_id)
+        queryset = filter_by_related_object(queryset, self.request.query_params)
         
         return queryset.select_related('created_by')
     
@@ -154,11 +174,7 @@ class ActivityListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(status=status_filter)
         
         # Filter by content type and object id if provided
-        content_type_id = self.request.query_params.get('content_type')
-        object_id = self.request.query_params.get('object_id')
-        
-        if content_type_id and object_id:
-            queryset = queryset.filter(content_type_id=content_type_id, object_id=object_id)
+        queryset = filter_by_related_object(queryset, self.request.query_params)
         
         return queryset.select_related('assigned_to', 'created_by')
     
@@ -169,6 +185,19 @@ class ActivityListCreateView(generics.ListCreateAPIView):
         )
 
 
+class OverdueActivityListView(generics.ListAPIView):
+    """List open activities past their scheduled date."""
+    
+    serializer_class = ActivitySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        user = self.request.user
+        if user.has_organization_permission('view_all_activities'):
+            return overdue_activities(user.organization)
+        return overdue_activities(user.organization, user=user)
+
+
 class ActivityDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, and delete activities."""
     
@@ -257,6 +286,152 @@ class DashboardDetailView(generics.RetrieveUpdateDestroyAPIView):
         return queryset.prefetch_related('widgets')
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard_widget_data_view(request, pk):
+    """Compute the data of every widget on a dashboard."""
+    dashboards = Dashboard.objects.filter(organization=request.user.organization)
+    if not request.user.has_organization_permission('view_all_dashboards'):
+        dashboards = dashboards.filter(Q(is_shared=True) | Q(created_by=request.user))
+    
+    try:
+        dashboard = dashboards.prefetch_related('widgets').get(pk=pk)
+    except Dashboard.DoesNotExist:
+        return Response(
+            {'error': 'Dashboard not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    results = dashboard_widget_data(dashboard)
+    return Response({
+        'dashboard': dashboard.pk,
+        'widgets': [
+            {'id': widget.pk, 'widget_type': widget.widget_type, **results[widget.pk]}
+            for widget in dashboard.widgets.all()
+        ]
+    })
+
+
+class ReportListCreateView(generics.ListCreateAPIView):
+    """List and create reports."""
+    
+    serializer_class = ReportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return visible_reports(self.request.user).select_related('created_by')
+    
+    def perform_create(self, serializer):
+        serializer.save(
+            organization=self.request.user.organization,
+            created_by=self.request.user
+        )
+
+
+class ReportDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update, and delete reports."""
+    
+    serializer_class = ReportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = Report.objects.filter(organization=self.request.user.organization)
+        
+        # Users can only modify their own reports unless they have permission
+        if not self.request.user.has_organization_permission('manage_all_reports'):
+            queryset = queryset.filter(created_by=self.request.user)
+        
+        return queryset.select_related('created_by')
+
+
+def visible_reports(user):
+    """Shared reports and the user's own, or all with permission."""
+    queryset = Report.objects.filter(organization=user.organization)
+    if not user.has_organization_permission('view_reports'):
+        queryset = queryset.filter(Q(is_shared=True) | Q(created_by=user))
+    return queryset
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def run_report_view(request, pk):
+    """Return a cached report result or queue the report as a background job."""
+    report = get_object_or_404(visible_reports(request.user), pk=pk)
+    
+    try:
+        result = cached_report_result(report)
+    except QueryConfigError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if result is not None:
+        return Response({'status': 'completed', 'result': result})
+    
+    return Response({
+        'status': 'queued',
+        'task_id': queue_report_run(report)
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_result_view(request, pk):
+    """Get the result of a report run, or the state of its background job."""
+    report = get_object_or_404(visible_reports(request.user), pk=pk)
+    
+    try:
+        result = cached_report_result(report)
+    except QueryConfigError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if result is not None:
+        return Response({'status': 'completed', 'result': result})
+    
+    # Only runs queued for this report are looked up
+    run = report_job(report)
+    task_id = request.query_params.get('task_id')
+    if run is None or (task_id and task_id != run['task_id']):
+        return Response(
+            {'error': 'Report has no current result; run it first'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    job = AsyncResult(run['task_id'])
+    if job.state == 'FAILURE':
+        return Response({'status': 'failed', 'error': str(job.info)})
+    if job.state == 'SUCCESS':
+        # The data changed after the job finished, so its result was superseded
+        return Response(
+            {'error': 'Report result is out of date; run it again'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response({'status': job.state.lower()}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_report_csv_view(request, pk):
+    """Stream every row of a report as CSV."""
+    report = get_object_or_404(visible_reports(request.user), pk=pk)
+    
+    try:
+        lines = stream_report_csv(report)
+    except QueryConfigError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{slugify(report.name) or "report"}.csv"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def organization_settings_view(request):
+    """Get the organization's settings; only public ones without ``manage_settings``."""
+    settings = organization_settings(request.user.organization_id)
+    public_only = not request.user.has_organization_permission('manage_settings')
+    return Response({'settings': settings.as_dict(public_only=public_only)})
+
+
 class NotificationListView(generics.ListAPIView):
     """List user notifications."""
     
@@ -329,20 +504,22 @@ def dashboard_stats_view(request):
         is_read=False
     ).count()
     
-    # System health (placeholder)
+    # System health from sampled response times
+    response_times = response_time_percentiles()
+    slow = response_times['p95'] is not None and response_times['p95'] > DEGRADED_RESPONSE_TIME_MS
     system_health = {
-        'status': 'healthy',
-        'uptime': '99.9%',
-        'response_time': '120ms'
+        'status': 'degraded' if slow else 'healthy',
+        'response_time_ms': response_times
     }
     
-    # Total records across modules (placeholder - would be calculated from actual modules)
-    total_records = 0
+    # Record totals from the maintained per-model counters
+    counts = record_counts(org)
     
     stats = {
         'total_users': total_users,
         'active_users': active_users,
-        'total_records': total_records,
+        'total_records': sum(counts.values()),
+        'record_counts': counts,
         'recent_activities': ActivitySerializer(recent_activities, many=True).data,
         'unread_notifications': unread_notifications,
         'system_health': system_health
@@ -356,38 +533,7 @@ def dashboard_stats_view(request):
 @permission_classes([permissions.IsAuthenticated])
 def activity_summary_view(request):
     """Get activity summary for the user."""
-    user = request.user
-    org = user.organization
-    
-    # Get activities for the user or all if they have permission
-    if user.has_organization_permission('view_all_activities'):
-        activities = Activity.objects.filter(organization=org)
-    else:
-        activities = Activity.objects.filter(organization=org, assigned_to=user)
-    
-    # Calculate summary
-    total_activities = activities.count()
-    completed_activities = activities.filter(status='completed').count()
-    overdue_activities = activities.filter(
-        status__in=['planned', 'in_progress'],
-        scheduled_date__lt=timezone.now()
-    ).count()
-    upcoming_activities = activities.filter(
-        status__in=['planned', 'in_progress'],
-        scheduled_date__gte=timezone.now(),
-        scheduled_date__lte=timezone.now() + timedelta(days=7)
-    ).count()
-    
-    completion_rate = (completed_activities / total_activities * 100) if total_activities > 0 else 0
-    
-    summary = {
-        'total_activities': total_activities,
-        'completed_activities': completed_activities,
-        'overdue_activities': overdue_activities,
-        'upcoming_activities': upcoming_activities,
-        'completion_rate': round(completion_rate, 2)
-    }
-    
+    summary = get_activity_summary(request.user)
     serializer = ActivitySummarySerializer(summary)
     return Response(serializer.data)
 
@@ -426,3 +572,37 @@ def related_objects_view(request):
             {'error': 'Object not found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def related_objects_batch_view(request):
+    """Get related objects, or only their counts, for many model instances at once."""
+    serializer = RelatedObjectBatchRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    counts_only = serializer.validated_data['counts_only']
+    pairs = [
+        (item['content_type'], item['object_id'])
+        for item in serializer.validated_data['objects']
+    ]
+    
+    related = related_objects(request.user.organization, pairs, counts_only=counts_only)
+    
+    results = []
+    for (content_type_id, object_id), objects in related.items():
+        entry = {'content_type': content_type_id, 'object_id': object_id}
+        if counts_only:
+            entry.update({
+                'note_count': objects['notes'],
+                'attachment_count': objects['attachments'],
+                'activity_count': objects['activities'],
+            })
+        else:
+            entry.update({
+                'notes': NoteSerializer(objects['notes'], many=True).data,
+                'attachments': AttachmentSerializer(objects['attachments'], many=True).data,
+                'activities': ActivitySerializer(objects['activities'], many=True).data,
+            })
+        results.append(entry)
+    
+    return Response({'results': results})
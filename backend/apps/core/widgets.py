@@ -0,0 +1,170 @@
+"""
+Server-side dashboard widget data.
+
+A widget's ``config`` declares what it shows::
+
+    {
+        "model": "crm.opportunity",
+        "measure": {"aggregate": "sum", "field": "estimated_value"},
+        "group_by": "stage",
+        "filters": {"stage__in": ["proposal", "negotiation"]},
+        "time_bucket": {"field": "expected_close_date", "interval": "month"},
+        "limit": 50
+    }
+
+Each config compiles to a single aggregate query scoped to the
+organization. The widgets of a dashboard are computed together on a
+thread pool and their results cached per widget. Cache keys embed the
+organization's data version of the widget's model, so stale results are
+never served past a save or delete.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+from django.db.models.functions import Trunc
+
+from .models import Activity
+from .queries import (
+    AGGREGATES, QueryConfigError, data_version_key, field_name, filtered_queryset,
+    parse_filters, parse_limit, parse_measure, parse_time_bucket, query_model,
+    register_query_model
+)
+
+WIDGET_CACHE_TIMEOUT = 300
+DEFAULT_WIDGET_ROW_LIMIT = 50
+MAX_WIDGET_ROW_LIMIT = 500
+
+logger = logging.getLogger(__name__)
+
+
+def parse_widget_config(config):
+    """Validate a widget config and return it in normalized form."""
+    model = query_model(config)
+    aggregate, measure_field = parse_measure(model, config.get('measure'))
+    group_by = config.get('group_by')
+    return {
+        'model': model,
+        'aggregate': aggregate,
+        'measure_field': measure_field,
+        'group_by': field_name(model, group_by, 'group by') if group_by else None,
+        'filters': parse_filters(model, config.get('filters')),
+        'time_bucket': parse_time_bucket(model, config.get('time_bucket')),
+        'limit': parse_limit(config.get('limit'), DEFAULT_WIDGET_ROW_LIMIT, MAX_WIDGET_ROW_LIMIT),
+    }
+
+
+def compute_widget_data(organization_id, config):
+    """Run the single aggregate query of a widget config."""
+    spec = parse_widget_config(config)
+    queryset = filtered_queryset(spec['model'], organization_id, spec['filters'])
+    value = AGGREGATES[spec['aggregate']](spec['measure_field'])
+
+    keys = []
+    if spec['time_bucket']:
+        queryset = queryset.annotate(
+            bucket=Trunc(spec['time_bucket']['field'], spec['time_bucket']['interval'])
+        )
+        keys.append('bucket')
+    if spec['group_by']:
+        keys.append(spec['group_by'])
+    if not keys:
+        return {'value': queryset.aggregate(value=value)['value']}
+
+    ordering = keys if spec['time_bucket'] else ['-value']
+    rows = queryset.order_by().values(*keys).annotate(value=value).order_by(*ordering)[:spec['limit']]
+    return {
+        'rows': [
+            {
+                **({'bucket': row['bucket']} if spec['time_bucket'] else {}),
+                **({'group': row[spec['group_by']]} if spec['group_by'] else {}),
+                'value': row['value'],
+            }
+            for row in rows
+        ]
+    }
+
+
+def _widget_cache_key(widget, version):
+    digest = hashlib.md5(json.dumps(widget.config, sort_keys=True, default=str).encode()).hexdigest()
+    return f'core:widget:{widget.pk}:{version}:{digest}'
+
+
+def _widget_outcome(organization_id, widget, in_thread=False):
+    """Return ``(data, error)`` for one widget; a failing widget never fails the dashboard."""
+    try:
+        # A savepoint keeps a failed query from breaking the caller's transaction
+        with transaction.atomic():
+            return compute_widget_data(organization_id, widget.config), None
+    except QueryConfigError as exc:
+        return None, str(exc)
+    except (DatabaseError, TypeError, ValueError):
+        logger.warning('Could not compute widget %s', widget.pk, exc_info=True)
+        return None, 'Widget data could not be computed.'
+    finally:
+        if in_thread:
+            # Pool threads get their own connections; do not leak them
+            connections.close_all()
+
+
+def dashboard_widget_data(dashboard, widgets=None):
+    """
+    Return ``{widget_id: {'data': ..., 'error': ...}}`` for a dashboard.
+
+    Cached results are fetched with one ``get_many``; the remaining widgets
+    are computed in parallel on up to ``settings.WIDGET_QUERY_WORKERS``
+    threads. Widgets without a ``model`` in their config get no data.
+    """
+    widgets = list(dashboard.widgets.all() if widgets is None else widgets)
+    organization_id = dashboard.organization_id
+    results = {}
+
+    queryable = []
+    for widget in widgets:
+        if isinstance(widget.config, dict) and widget.config.get('model'):
+            queryable.append(widget)
+        else:
+            results[widget.pk] = {'data': None, 'error': None}
+
+    version_keys = {
+        widget.pk: data_version_key(organization_id, str(widget.config['model']).lower())
+        for widget in queryable
+    }
+    versions = cache.get_many(set(version_keys.values()))
+    cache_keys = {
+        widget.pk: _widget_cache_key(widget, versions.get(version_keys[widget.pk], 0))
+        for widget in queryable
+    }
+    cached = cache.get_many(list(cache_keys.values()))
+
+    pending = []
+    for widget in queryable:
+        if cache_keys[widget.pk] in cached:
+            results[widget.pk] = {'data': cached[cache_keys[widget.pk]], 'error': None}
+        else:
+            pending.append(widget)
+
+    workers = min(settings.WIDGET_QUERY_WORKERS, len(pending))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(
+                lambda widget: _widget_outcome(organization_id, widget, in_thread=True), pending
+            ))
+    else:
+        outcomes = [_widget_outcome(organization_id, widget) for widget in pending]
+
+    fresh = {}
+    for widget, (data, error) in zip(pending, outcomes):
+        results[widget.pk] = {'data': data, 'error': error}
+        if error is None:
+            fresh[cache_keys[widget.pk]] = data
+    if fresh:
+        cache.set_many(fresh, WIDGET_CACHE_TIMEOUT)
+    return results
+
+
+register_query_model(Activity)
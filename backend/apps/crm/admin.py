@@ -2,10 +2,20 @@
 Admin configuration for CRM module.
 """
 from django.contrib import admin
+from django.db import models
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Contact, Lead, Opportunity, Campaign, SalesStage, EmailTemplate
+from .models import Contact, ContactDuplicate, CampaignEmailSend, OpportunityStageTransition, Lead, Opportunity, Campaign, SalesStage, EmailTemplate
+from .stats import invalidate_crm_stats
+
+
+def invalidate_selected_crm_stats(queryset):
+    """Drop cached CRM statistics of every organization in ``queryset``."""
+    organization_ids = queryset.order_by().values_list('organization_id', flat=True).distinct()
+    for organization_id in organization_ids:
+        invalidate_crm_stats(organization_id)
 
 
 @admin.register(Contact)
@@ -25,6 +35,8 @@ class ContactAdmin(admin.ModelAdmin):
         'phone', 'mobile'
     ]
     readonly_fields = ['id', 'created_at', 'updated_at', 'full_name']
+    raw_id_fields = ['parent_contact']
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -82,6 +94,9 @@ class LeadAdmin(admin.ModelAdmin):
         'converted_at', 'created_at', 'updated_at'
     ]
     date_hierarchy = 'expected_close_date'
+    raw_id_fields = ['campaign']
+    list_select_related = ['assigned_to']
+    show_full_result_count = False
     
     fieldsets = (
         ('Lead Information', {
@@ -93,7 +108,7 @@ class LeadAdmin(admin.ModelAdmin):
         ('Sales Information', {
             'fields': (
                 'estimated_value', 'probability', 'assigned_to', 
-                'expected_close_date'
+                'expected_close_date', 'campaign'
             )
         }),
         ('Conversion', {
@@ -135,6 +150,9 @@ class OpportunityAdmin(admin.ModelAdmin):
         'actual_close_date', 'created_at', 'updated_at'
     ]
     date_hierarchy = 'expected_close_date'
+    raw_id_fields = ['campaign', 'contact']
+    list_select_related = ['contact', 'assigned_to']
+    show_full_result_count = False
     
     fieldsets = (
         ('Opportunity Information', {
@@ -149,7 +167,7 @@ class OpportunityAdmin(admin.ModelAdmin):
             )
         }),
         ('Additional Information', {
-            'fields': ('competitors', 'lead_source', 'tags'),
+            'fields': ('competitors', 'lead_source', 'campaign', 'tags'),
             'classes': ('collapse',)
         }),
         ('Status & Metadata', {
@@ -158,14 +176,27 @@ class OpportunityAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            weighted_amount=models.ExpressionWrapper(
+                models.F('estimated_value') * models.F('probability') / 100,
+                output_field=models.DecimalField(max_digits=15, decimal_places=2)
+            )
+        )
+    
     def weighted_value(self, obj):
-        return f"${obj.weighted_value:,.2f}"
+        value = getattr(obj, 'weighted_amount', None)
+        if value is None:
+            value = obj.weighted_value
+        return f"${value:,.2f}"
     weighted_value.short_description = 'Weighted Value'
+    weighted_value.admin_order_field = 'weighted_amount'
     
     def is_closed(self, obj):
         return obj.is_closed
     is_closed.boolean = True
     is_closed.short_description = 'Closed'
+    is_closed.admin_order_field = 'stage'
 
 
 @admin.register(Campaign)
@@ -182,6 +213,7 @@ class CampaignAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     readonly_fields = ['id', 'is_active', 'roi', 'created_at', 'updated_at']
     date_hierarchy = 'start_date'
+    list_select_related = ['assigned_to']
     
     fieldsets = (
         ('Campaign Information', {
@@ -199,18 +231,22 @@ class CampaignAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_performance()
+    
     def roi_display(self, obj):
         roi = obj.roi
         if roi > 0:
             return format_html(
-                '<span style="color: green;">+{:.1f}%</span>', roi
+                '<span style="color: green;">+{}%</span>', f"{roi:.1f}"
             )
         elif roi < 0:
             return format_html(
-                '<span style="color: red;">{:.1f}%</span>', roi
+                '<span style="color: red;">{}%</span>', f"{roi:.1f}"
             )
         return f"{roi:.1f}%"
     roi_display.short_description = 'ROI'
+    roi_display.admin_order_field = 'roi_value'
 
 
 @admin.register(SalesStage)
@@ -268,22 +304,73 @@ class EmailTemplateAdmin(admin.ModelAdmin):
     subject_preview.short_description = 'Subject'
 
 
+@admin.register(OpportunityStageTransition)
+class OpportunityStageTransitionAdmin(admin.ModelAdmin):
+    """Read-only admin for the append-only stage history."""
+    
+    list_display = ['opportunity', 'from_stage', 'to_stage', 'transitioned_at', 'created_by']
+    list_filter = ['to_stage', 'organization']
+    list_select_related = ['opportunity', 'opportunity__contact', 'created_by']
+    raw_id_fields = ['opportunity']
+    date_hierarchy = 'transitioned_at'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CampaignEmailSend)
+class CampaignEmailSendAdmin(admin.ModelAdmin):
+    """Admin for CampaignEmailSend model."""
+    
+    list_display = [
+        'campaign', 'template', 'status', 'total_recipients', 'sent_count',
+        'failed_count', 'started_at', 'completed_at'
+    ]
+    list_filter = ['status', 'organization', 'created_at']
+    list_select_related = ['campaign', 'template']
+    raw_id_fields = ['campaign', 'template']
+    readonly_fields = [
+        'id', 'total_recipients', 'sent_count', 'failed_count', 'started_at',
+        'completed_at', 'created_at', 'updated_at'
+    ]
+
+
+@admin.register(ContactDuplicate)
+class ContactDuplicateAdmin(admin.ModelAdmin):
+    """Admin for ContactDuplicate model."""
+    
+    list_display = ['contact', 'duplicate', 'score', 'matched_on', 'status', 'created_at']
+    list_filter = ['status', 'organization']
+    list_select_related = ['contact', 'duplicate']
+    raw_id_fields = ['contact', 'duplicate']
+    readonly_fields = ['id', 'score', 'matched_on', 'created_at', 'updated_at']
+
+
 # Custom admin actions
 @admin.action(description='Mark selected leads as contacted')
 def mark_leads_contacted(modeladmin, request, queryset):
-    queryset.update(status='contacted')
+    updated = queryset.exclude(status='contacted').update(
+        status='contacted', updated_by=request.user, updated_at=timezone.now()
+    )
+    invalidate_selected_crm_stats(queryset)
+    modeladmin.message_user(request, f'{updated} lead(s) marked as contacted.')
 
 
 @admin.action(description='Mark selected opportunities as won')
 def mark_opportunities_won(modeladmin, request, queryset):
-    for opportunity in queryset:
-        opportunity.close_as_won(request.user)
+    closed = Opportunity.bulk_close(queryset, 'closed_won', request.user)
+    invalidate_selected_crm_stats(queryset)
+    modeladmin.message_user(request, f'{closed} opportunity(ies) marked as won.')
 
 
 @admin.action(description='Mark selected opportunities as lost')
 def mark_opportunities_lost(modeladmin, request, queryset):
-    for opportunity in queryset:
-        opportunity.close_as_lost(request.user)
+    closed = Opportunity.bulk_close(queryset, 'closed_lost', request.user)
+    invalidate_selected_crm_stats(queryset)
+    modeladmin.message_user(request, f'{closed} opportunity(ies) marked as lost.')
 
 
 # Add actions to admin classes
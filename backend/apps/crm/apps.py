@@ -8,3 +8,7 @@ class CrmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.crm'
     verbose_name = 'Customer Relationship Management'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.crm.signals  # noqa F401
@@ -0,0 +1,163 @@
+"""
+Contact deduplication and merging.
+
+Candidate pairs are only generated inside blocks of contacts that share a
+normalized key (email, phone digits or name prefix), so the job never
+compares every contact against every other one.
+"""
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.core.models import Note, Attachment, Activity, Notification
+from .models import Contact, ContactDuplicate, Lead, Opportunity
+
+BLOCKING_KEYS = ['email_key', 'phone_key', 'name_key']
+
+# Keys shared by more contacts than this are too generic to block on
+MAX_BLOCK_SIZE = 50
+
+KEY_WEIGHTS = {'email_key': 50, 'phone_key': 30}
+NAME_WEIGHT = 40
+MIN_DUPLICATE_SCORE = 35
+
+# Blank fields on the surviving contact are filled from the merged ones
+MERGE_FILL_FIELDS = [
+    'salutation', 'last_name', 'company_name', 'job_title', 'phone', 'mobile',
+    'website', 'street_address', 'city', 'state', 'postal_code', 'country',
+    'industry', 'linkedin_url', 'twitter_handle', 'facebook_url', 'source',
+    'description',
+]
+MERGE_FILL_NULLABLE_FIELDS = ['annual_revenue', 'employee_count', 'parent_contact_id']
+
+
+def _comparable_name(row):
+    if row['contact_type'] == 'company':
+        return row['company_name'].lower()
+    return f"{row['first_name']} {row['last_name']}".strip().lower()
+
+
+def score_pair(first, second, matched_on):
+    """Score a candidate pair between 0 and 100."""
+    score = sum(KEY_WEIGHTS.get(key, 0) for key in matched_on)
+    similarity = SequenceMatcher(None, _comparable_name(first), _comparable_name(second)).ratio()
+    return min(100, round(score + NAME_WEIGHT * similarity, 2))
+
+
+def find_duplicate_candidates(organization_id):
+    """
+    Return ``(contact_id, duplicate_id, score, matched_on)`` tuples for an
+    organization using one grouped query per blocking key.
+    """
+    contacts = Contact.objects.filter(organization_id=organization_id, is_active=True)
+    rows = {}
+    matches = defaultdict(set)
+
+    for key in BLOCKING_KEYS:
+        shared_values = (
+            contacts.exclude(**{key: ''})
+            .values(key)
+            .annotate(block_size=Count('id'))
+            .filter(block_size__gt=1, block_size__lte=MAX_BLOCK_SIZE)
+            .values(key)
+        )
+        blocks = defaultdict(list)
+        for row in contacts.filter(**{f'{key}__in': shared_values}).values(
+            'id', 'contact_type', 'first_name', 'last_name', 'company_name', key
+        ):
+            rows[row['id']] = row
+            blocks[row[key]].append(row['id'])
+
+        for members in blocks.values():
+            for pair in combinations(sorted(members, key=str), 2):
+                matches[pair].add(key)
+
+    candidates = []
+    for (contact_id, duplicate_id), matched_on in matches.items():
+        score = score_pair(rows[contact_id], rows[duplicate_id], matched_on)
+        if score >= MIN_DUPLICATE_SCORE:
+            candidates.append((contact_id, duplicate_id, score, sorted(matched_on)))
+    return candidates
+
+
+def refresh_duplicate_candidates(organization_id):
+    """Replace pending candidates; dismissed pairs are kept and not re-raised."""
+    candidates = find_duplicate_candidates(organization_id)
+
+    with transaction.atomic():
+        ContactDuplicate.objects.filter(organization_id=organization_id, status='pending').delete()
+        ContactDuplicate.objects.bulk_create(
+            [
+                ContactDuplicate(
+                    organization_id=organization_id,
+                    contact_id=contact_id,
+                    duplicate_id=duplicate_id,
+                    score=score,
+                    matched_on=matched_on
+                )
+                for contact_id, duplicate_id, score, matched_on in candidates
+            ],
+            ignore_conflicts=True
+        )
+    return len(candidates)
+
+
+@transaction.atomic
+def merge_contacts(primary, duplicates, user=None):
+    """
+    Merge ``duplicates`` into ``primary`` and delete them.
+
+    Opportunities, converted leads, child contacts, tags and generic
+    notes/attachments/activities/notifications are re-pointed with one
+    bulk statement each. Duplicate candidates of the deleted contacts are
+    deleted with them. Returns the number of merged contacts.
+    """
+    duplicates = [contact for contact in duplicates if contact.pk != primary.pk]
+    if not duplicates:
+        return 0
+    duplicate_ids = [contact.pk for contact in duplicates]
+    now = timezone.now()
+
+    Opportunity.objects.filter(contact_id__in=duplicate_ids).update(contact=primary, updated_at=now)
+    Lead.objects.filter(converted_contact_id__in=duplicate_ids).update(converted_contact=primary, updated_at=now)
+    Contact.objects.filter(parent_contact_id__in=duplicate_ids).exclude(pk=primary.pk).update(
+        parent_contact=primary, updated_at=now
+    )
+
+    tag_through = Contact.tags.through
+    existing_tag_ids = set(primary.tags.values_list('id', flat=True))
+    merged_tag_ids = set(
+        tag_through.objects.filter(contact_id__in=duplicate_ids).values_list('tag_id', flat=True)
+    )
+    tag_through.objects.bulk_create(
+        [tag_through(contact_id=primary.pk, tag_id=tag_id) for tag_id in merged_tag_ids - existing_tag_ids],
+        ignore_conflicts=True
+    )
+
+    content_type = ContentType.objects.get_for_model(Contact)
+    for model in (Note, Attachment, Activity, Notification):
+        model.objects.filter(content_type=content_type, object_id__in=duplicate_ids).update(
+            object_id=primary.pk
+        )
+
+    if primary.parent_contact_id in duplicate_ids:
+        primary.parent_contact_id = None
+    for duplicate in duplicates:
+        for field in MERGE_FILL_FIELDS:
+            if not getattr(primary, field) and getattr(duplicate, field):
+                setattr(primary, field, getattr(duplicate, field))
+        for field in MERGE_FILL_NULLABLE_FIELDS:
+            value = getattr(duplicate, field)
+            if getattr(primary, field) is None and value is not None and value not in duplicate_ids + [primary.pk]:
+                setattr(primary, field, value)
+    if user is not None:
+        primary.updated_by = user
+    primary.save()
+
+    Contact.objects.filter(pk__in=duplicate_ids).delete()
+    return len(duplicate_ids)
@@ -0,0 +1,104 @@
+"""
+Monthly sales forecast over ``Opportunity.expected_close_date``.
+"""
+from collections import OrderedDict
+from datetime import date
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Opportunity
+from .stats import weighted_value_sum
+
+FORECAST_GROUP_BY = {
+    'assignee': ['assigned_to', 'assigned_to__first_name', 'assigned_to__last_name'],
+    'stage': ['stage'],
+}
+MAX_FORECAST_MONTHS = 36
+
+
+def add_months(month, count):
+    """Return the first day of the month ``count`` months after ``month``."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def forecast_months(start, end):
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        yield month
+        month = add_months(month, 1)
+
+
+def _empty_bucket():
+    return {'count': 0, 'pipeline_value': 0, 'weighted_value': 0, 'won_value': 0}
+
+
+def _breakdown_key(row, group_by):
+    if group_by == 'stage':
+        return row['stage'], dict(Opportunity.STAGE_CHOICES).get(row['stage'], row['stage'])
+    if row['assigned_to'] is None:
+        return None, 'Unassigned'
+    name = f"{row['assigned_to__first_name']} {row['assigned_to__last_name']}".strip()
+    return str(row['assigned_to']), name
+
+
+def compute_forecast(organization, start, end, group_by=None):
+    """
+    Bucket open and won opportunities by expected close month with one
+    grouped query, optionally broken down per assignee or stage.
+
+    ``start`` and ``end`` are first-of-month dates; ``end`` is inclusive.
+    """
+    open_stages = Q(stage__in=Opportunity.OPEN_STAGES)
+    won = Q(stage='closed_won')
+
+    rows = (
+        Opportunity.objects.filter(
+            organization=organization,
+            stage__in=Opportunity.OPEN_STAGES + ['closed_won'],
+            expected_close_date__gte=start,
+            expected_close_date__lt=add_months(end, 1)
+        )
+        .annotate(month=TruncMonth('expected_close_date'))
+        .values('month', *FORECAST_GROUP_BY.get(group_by, []))
+        .annotate(
+            count=Count('id'),
+            pipeline_value=Sum('estimated_value', filter=open_stages),
+            weighted_value=weighted_value_sum(filter=open_stages),
+            won_value=Sum('estimated_value', filter=won)
+        )
+        .order_by('month')
+    )
+
+    months = OrderedDict((month, _empty_bucket()) for month in forecast_months(start, end))
+    breakdowns = {month: {} for month in months}
+
+    for row in rows:
+        month = row['month']
+        if hasattr(month, 'date'):
+            month = month.date()
+        values = {
+            'count': row['count'],
+            'pipeline_value': row['pipeline_value'] or 0,
+            'weighted_value': row['weighted_value'] or 0,
+            'won_value': row['won_value'] or 0,
+        }
+        for field, value in values.items():
+            months[month][field] += value
+
+        if group_by in FORECAST_GROUP_BY:
+            key, label = _breakdown_key(row, group_by)
+            bucket = breakdowns[month].setdefault(key, {'key': key, 'label': label, **_empty_bucket()})
+            for field, value in values.items():
+                bucket[field] += value
+
+    result = []
+    for month, totals in months.items():
+        entry = {'month': month, **totals}
+        if group_by in FORECAST_GROUP_BY:
+            entry['breakdown'] = sorted(
+                breakdowns[month].values(), key=lambda bucket: bucket['weighted_value'], reverse=True
+            )
+        result.append(entry)
+    return result
@@ -0,0 +1,132 @@
+"""
+Contact account hierarchies built from ``Contact.parent_contact``.
+
+Trees are walked with recursive CTEs so a whole account hierarchy, including
+opportunity totals rolled up over every node's subtree, is fetched in a
+single query.
+"""
+from django.db import connections
+
+from .models import Contact, Opportunity
+
+MAX_HIERARCHY_DEPTH = 25
+
+DESCENDANTS_STEP = """
+    SELECT related.id, related.parent_contact_id, nodes.depth + 1
+    FROM crm_contacts related
+    JOIN nodes ON related.parent_contact_id = nodes.id
+    WHERE related.organization_id = %s AND nodes.depth < %s
+"""
+
+ANCESTORS_STEP = """
+    SELECT related.id, related.parent_contact_id, nodes.depth + 1
+    FROM crm_contacts related
+    JOIN nodes ON related.id = nodes.parent_contact_id
+    WHERE related.organization_id = %s AND nodes.depth < %s
+"""
+
+NODES_CTE = """
+nodes (id, parent_contact_id, depth) AS (
+    SELECT id, parent_contact_id, 0
+    FROM crm_contacts
+    WHERE id = %s AND organization_id = %s
+    UNION ALL
+    {step}
+)
+"""
+
+HIERARCHY_SQL = """
+WITH RECURSIVE {nodes},
+subtree (root_id, contact_id, depth) AS (
+    SELECT id, id, 0 FROM nodes
+    UNION ALL
+    SELECT subtree.root_id, child.id, subtree.depth + 1
+    FROM crm_contacts child
+    JOIN subtree ON child.parent_contact_id = subtree.contact_id
+    WHERE child.organization_id = %s AND subtree.depth < %s
+)
+SELECT
+    nodes.id, nodes.parent_contact_id, nodes.depth,
+    contact.contact_type, contact.first_name, contact.last_name, contact.company_name,
+    COUNT(DISTINCT subtree.contact_id) - 1,
+    SUM(CASE WHEN subtree.contact_id = nodes.id AND opportunity.id IS NOT NULL THEN 1 ELSE 0 END),
+    COALESCE(SUM(CASE WHEN subtree.contact_id = nodes.id THEN opportunity.estimated_value END), 0),
+    COUNT(opportunity.id),
+    COALESCE(SUM(opportunity.estimated_value), 0),
+    COALESCE(SUM(CASE WHEN opportunity.stage IN ({open_stages}) THEN opportunity.estimated_value END), 0),
+    COALESCE(SUM(CASE WHEN opportunity.stage = %s THEN opportunity.estimated_value END), 0)
+FROM nodes
+JOIN crm_contacts contact ON contact.id = nodes.id
+JOIN subtree ON subtree.root_id = nodes.id
+LEFT JOIN crm_opportunities opportunity
+    ON opportunity.contact_id = subtree.contact_id AND opportunity.organization_id = %s
+GROUP BY
+    nodes.id, nodes.parent_contact_id, nodes.depth,
+    contact.contact_type, contact.first_name, contact.last_name, contact.company_name
+ORDER BY nodes.depth, contact.company_name, contact.first_name, contact.last_name
+"""
+
+HIERARCHY_COLUMNS = [
+    'id', 'parent_contact', 'depth', 'contact_type', 'first_name', 'last_name',
+    'company_name', 'descendant_count', 'opportunity_count', 'opportunity_value',
+    'rollup_opportunity_count', 'rollup_opportunity_value', 'rollup_open_value',
+    'rollup_won_value',
+]
+
+
+def _nodes_cte(direction):
+    step = ANCESTORS_STEP if direction == 'ancestors' else DESCENDANTS_STEP
+    return NODES_CTE.format(step=step)
+
+
+def _prep_uuid(value, connection):
+    return Contact._meta.pk.get_db_prep_value(value, connection)
+
+
+def _nodes_params(contact, max_depth, connection):
+    organization_id = _prep_uuid(contact.organization_id, connection)
+    return [_prep_uuid(contact.pk, connection), organization_id, organization_id, max_depth]
+
+
+def contact_ancestor_ids(contact, max_depth=MAX_HIERARCHY_DEPTH):
+    """Return the ids of the contact's parent chain, nearest first."""
+    connection = connections[Contact.objects.db]
+    sql = f"WITH RECURSIVE {_nodes_cte('ancestors')} SELECT id FROM nodes WHERE depth > 0 ORDER BY depth"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, _nodes_params(contact, max_depth, connection))
+        return [Contact._meta.pk.to_python(row[0]) for row in cursor.fetchall()]
+
+
+def contact_hierarchy(contact, direction='descendants', max_depth=MAX_HIERARCHY_DEPTH):
+    """
+    Return the contact and its descendants (or ancestors) as flat rows with
+    ``depth`` and opportunity totals, own and rolled up over each subtree.
+    """
+    connection = connections[Contact.objects.db]
+    organization_id = _prep_uuid(contact.organization_id, connection)
+    sql = HIERARCHY_SQL.format(
+        nodes=_nodes_cte(direction),
+        open_stages=', '.join(['%s'] * len(Opportunity.OPEN_STAGES))
+    )
+    params = (
+        _nodes_params(contact, max_depth, connection)
+        + [organization_id, max_depth]
+        + list(Opportunity.OPEN_STAGES)
+        + ['closed_won', organization_id]
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = [dict(zip(HIERARCHY_COLUMNS, row)) for row in cursor.fetchall()]
+
+    for row in rows:
+        row['id'] = Contact._meta.pk.to_python(row['id'])
+        if row['parent_contact'] is not None:
+            row['parent_contact'] = Contact._meta.pk.to_python(row['parent_contact'])
+        row['display_name'] = Contact(
+            contact_type=row['contact_type'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            company_name=row['company_name']
+        ).display_name
+    return rows
@@ -0,0 +1,254 @@
+"""
+Campaign mass email rendering and delivery.
+
+Recipients are stored up front with one bulk insert per batch, then each
+batch is rendered from a single compiled template and sent over one
+reused email backend connection. Delivery is throttled to
+``settings.CAMPAIGN_EMAIL_RATE_LIMIT`` messages per second across all
+workers by a rate window shared through the cache.
+
+Templates only see a whitelist of plain contact and campaign values, never
+model instances, so they cannot reach related objects.
+"""
+import math
+import re
+import smtplib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.template import Context, Engine
+from django.utils import timezone
+
+from .models import CampaignEmailRecipient, CampaignEmailSend
+
+RATE_LIMIT_KEY = 'crm:campaign-email-rate'
+# Delivered recipients are stored after this many messages
+PROGRESS_CHUNK_SIZE = 20
+# SMTP errors about one message; any other SMTP or socket error aborts the batch
+RECIPIENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)
+
+# Plain text parts are not HTML-escaped; HTML bodies are
+text_template_engine = Engine(autoescape=False)
+html_template_engine = Engine(autoescape=True)
+
+HTML_TAG_RE = re.compile(r'<[a-zA-Z][^>]*>')
+
+CONTACT_TEMPLATE_FIELDS = [
+    'salutation', 'first_name', 'last_name', 'full_name', 'company_name',
+    'job_title', 'email', 'city', 'state', 'country', 'industry',
+]
+CAMPAIGN_TEMPLATE_FIELDS = ['name', 'description', 'start_date', 'end_date']
+
+
+class RateLimiter:
+    """
+    Allow at most ``rate`` calls per second across every process.
+
+    Calls are counted in fixed windows with ``cache.incr``; a call that
+    finds its window full waits for the next one.
+    """
+
+    def __init__(self, rate, key=RATE_LIMIT_KEY):
+        self.key = key
+        if rate and rate > 0:
+            self.window = max(1.0, 1 / rate)
+            self.capacity = max(1, math.floor(rate * self.window))
+        else:
+            self.window = self.capacity = None
+
+    def wait(self):
+        if not self.window:
+            return
+        while True:
+            now = time.time()
+            slot = int(now // self.window)
+            key = f'{self.key}:{slot}'
+            cache.add(key, 0, timeout=math.ceil(self.window) + 1)
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                # The window expired between add and incr
+                continue
+            if count <= self.capacity:
+                return
+            time.sleep((slot + 1) * self.window - now)
+
+
+def is_html(body):
+    return bool(HTML_TAG_RE.search(body or ''))
+
+
+def compile_email_template(template):
+    """
+    Compile an ``EmailTemplate`` subject and body once for a batch.
+
+    Returns ``(subject, body, html)``; HTML bodies autoescape contact data.
+    """
+    html = is_html(template.body)
+    body_engine = html_template_engine if html else text_template_engine
+    return (
+        text_template_engine.from_string(template.subject),
+        body_engine.from_string(template.body),
+        html,
+    )
+
+
+def _template_values(instance, fields):
+    if instance is None:
+        return {field: '' for field in fields}
+    return {field: getattr(instance, field, '') or '' for field in fields}
+
+
+def recipient_context(recipient, campaign):
+    """Template values of one recipient; only strings and dates."""
+    contact = _template_values(recipient.contact, CONTACT_TEMPLATE_FIELDS)
+    contact['email'] = recipient.email
+    return {
+        'contact': contact,
+        'first_name': contact['first_name'],
+        'last_name': contact['last_name'],
+        'full_name': contact['full_name'],
+        'company_name': contact['company_name'],
+        'email': recipient.email,
+        'campaign': _template_values(campaign, CAMPAIGN_TEMPLATE_FIELDS),
+    }
+
+
+def render(template, values):
+    """Render with the escaping of the template's engine."""
+    return template.render(Context(values, autoescape=template.engine.autoescape))
+
+
+def create_recipients(send, contacts, batch_size=None):
+    """
+    Bulk insert one pending recipient per distinct email in ``contacts`` and
+    return the recipient ids grouped into delivery batches.
+    """
+    batch_size = batch_size or settings.CAMPAIGN_EMAIL_BATCH_SIZE
+    seen_emails = set()
+    batches = []
+    batch = []
+
+    rows = contacts.values_list('id', 'email', 'email_key').iterator(chunk_size=batch_size)
+    for contact_id, email, email_key in rows:
+        key = email_key or email.strip().lower()
+        if not key or key in seen_emails:
+            continue
+        seen_emails.add(key)
+        batch.append(CampaignEmailRecipient(
+            organization_id=send.organization_id,
+            created_by_id=send.created_by_id,
+            send=send,
+            contact_id=contact_id,
+            email=email.strip()
+        ))
+        if len(batch) >= batch_size:
+            CampaignEmailRecipient.objects.bulk_create(batch)
+            batches.append([str(recipient.pk) for recipient in batch])
+            batch = []
+
+    if batch:
+        CampaignEmailRecipient.objects.bulk_create(batch)
+        batches.append([str(recipient.pk) for recipient in batch])
+    return batches
+
+
+def _save_outcomes(send, recipients):
+    """Store the status of delivered ``recipients`` and add them to the send counters."""
+    if not recipients:
+        return
+    now = timezone.now()
+    for recipient in recipients:
+        recipient.updated_at = now
+    CampaignEmailRecipient.objects.bulk_update(recipients, ['status', 'error', 'sent_at', 'updated_at'])
+    record_progress(
+        send,
+        sum(recipient.status == 'sent' for recipient in recipients),
+        sum(recipient.status == 'failed' for recipient in recipients)
+    )
+
+
+def deliver_recipients(send, recipient_ids):
+    """
+    Render and send one batch of pending recipients; return (sent, failed).
+
+    Outcomes are stored every ``PROGRESS_CHUNK_SIZE`` messages, so a crashed
+    worker re-sends at most one chunk. Errors refusing a single recipient
+    mark it failed; connection errors are raised after storing the outcomes
+    so far, and the retried batch only sends to recipients still pending.
+    """
+    recipients = list(
+        CampaignEmailRecipient.objects.filter(send=send, pk__in=recipient_ids, status='pending')
+        .select_related('contact')
+    )
+    if not recipients:
+        return 0, 0
+
+    subject_template, body_template, html = compile_email_template(send.template)
+    from_email = send.from_email or settings.DEFAULT_FROM_EMAIL
+    throttle = RateLimiter(settings.CAMPAIGN_EMAIL_RATE_LIMIT)
+    sent = failed = 0
+    delivered = []
+
+    connection = get_connection()
+    connection.open()
+    try:
+        for recipient in recipients:
+            context = recipient_context(recipient, send.campaign)
+            message = EmailMessage(
+                subject=' '.join(render(subject_template, context).split()),
+                body=render(body_template, context),
+                from_email=from_email,
+                to=[recipient.email],
+                connection=connection
+            )
+            if html:
+                message.content_subtype = 'html'
+            throttle.wait()
+            try:
+                message.send()
+            except RECIPIENT_ERRORS as exc:
+                recipient.status = 'failed'
+                recipient.error = str(exc)[:1000]
+                failed += 1
+            else:
+                recipient.status = 'sent'
+                recipient.sent_at = timezone.now()
+                sent += 1
+            delivered.append(recipient)
+            if len(delivered) >= PROGRESS_CHUNK_SIZE:
+                _save_outcomes(send, delivered)
+                delivered = []
+    finally:
+        # Also runs when a connection error aborts the batch
+        _save_outcomes(send, delivered)
+        connection.close()
+
+    return sent, failed
+
+
+def fail_recipients(send, recipient_ids, error):
+    """Mark a batch that could not be delivered at all as failed."""
+    failed = CampaignEmailRecipient.objects.filter(
+        send=send, pk__in=recipient_ids, status='pending'
+    ).update(status='failed', error=error[:1000], updated_at=timezone.now())
+    record_progress(send, 0, failed)
+    return failed
+
+
+def record_progress(send, sent, failed):
+    """Add batch results to the send counters and complete it after the last batch."""
+    now = timezone.now()
+    CampaignEmailSend.objects.filter(pk=send.pk).update(
+        sent_count=F('sent_count') + sent,
+        failed_count=F('failed_count') + failed,
+        updated_at=now
+    )
+    CampaignEmailSend.objects.filter(
+        pk=send.pk,
+        status='sending',
+        sent_count__gte=F('total_recipients') - F('failed_count')
+    ).update(status='completed', completed_at=now)
@@ -0,0 +1,39 @@
+"""
+Backfill the normalized blocking keys and search text of contacts.
+
+Contacts saved before these columns existed have them empty, so they are
+missed by deduplication and search until this command has run once.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.crm.models import Contact
+from apps.crm.tasks import refresh_contact_normalized_fields_task
+
+
+class Command(BaseCommand):
+    help = 'Recompute normalized contact fields used by search and deduplication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', help='Only refresh contacts of this organization id.')
+        parser.add_argument(
+            '--queue', action='store_true',
+            help='Queue one Celery task per organization instead of running inline.'
+        )
+
+    def handle(self, *args, **options):
+        if options['organization']:
+            organization_ids = [options['organization']]
+        else:
+            organization_ids = (
+                Contact.objects.order_by()
+                .values_list('organization_id', flat=True)
+                .distinct()
+            )
+
+        for organization_id in organization_ids:
+            if options['queue']:
+                refresh_contact_normalized_fields_task.delay(str(organization_id))
+                self.stdout.write(f'{organization_id}: queued')
+            else:
+                result = refresh_contact_normalized_fields_task(str(organization_id))
+                self.stdout.write(f'{organization_id}: refreshed {result["refreshed"]} contacts')
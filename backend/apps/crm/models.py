@@ -1,14 +1,41 @@
 """
 CRM models for customer relationship management.
 """
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.validators import EmailValidator, RegexValidator
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from apps.core.models import BaseModel
+from apps.core.models import BaseModel, RelatedObjectsModel
+import re
+import unicodedata
 import uuid
 
 
-class Contact(BaseModel):
+def normalize_email(value):
+    """Blocking key for emails: trimmed and lowercased."""
+    return (value or '').strip().lower()
+
+
+def normalize_phone(value):
+    """Blocking key for phone numbers: digits only."""
+    return re.sub(r'\D', '', value or '')
+
+
+def name_block_key(*parts):
+    """Blocking key for names: first three letters of each name part."""
+    return ''.join(re.sub(r'[^a-z0-9]', '', (part or '').lower())[:3] for part in parts)
+
+
+def normalize_search_text(*parts):
+    """Lowercase, strip accents and collapse whitespace for search columns."""
+    text = unicodedata.normalize('NFKD', ' '.join(part for part in parts if part))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+class Contact(BaseModel, RelatedObjectsModel):
     """Contact model for customers and prospects."""
     
     CONTACT_TYPES = [
@@ -80,6 +107,14 @@ class Contact(BaseModel):
     source = models.CharField(max_length=100, blank=True)  # How we got this contact
     description = models.TextField(blank=True)
     
+    # Normalized blocking keys used for duplicate detection
+    email_key = models.CharField(max_length=254, blank=True, editable=False)
+    phone_key = models.CharField(max_length=20, blank=True, editable=False)
+    name_key = models.CharField(max_length=12, blank=True, editable=False)
+    
+    # Normalized names, company, email and phone digits for search
+    search_text = models.TextField(blank=True, editable=False)
+    
     class Meta:
         db_table = 'crm_contacts'
         ordering = ['first_name', 'last_name', 'company_name']
@@ -87,6 +122,19 @@ class Contact(BaseModel):
             models.Index(fields=['email']),
             models.Index(fields=['organization', 'is_active']),
             models.Index(fields=['contact_type']),
+            models.Index(fields=['organization', 'email_key']),
+            models.Index(fields=['organization', 'phone_key']),
+            models.Index(fields=['organization', 'name_key']),
+            models.Index(fields=['organization', '-created_at']),
+            GinIndex(
+                SearchVector('search_text', config='simple'),
+                name='crm_contact_search_vec_idx'
+            ),
+            GinIndex(
+                fields=['search_text'],
+                name='crm_contact_search_trgm_idx',
+                opclasses=['gin_trgm_ops']
+            ),
         ]
     
     def __str__(self):
@@ -108,9 +156,31 @@ class Contact(BaseModel):
         if self.company_name:
             name += f" ({self.company_name})"
         return name
+    
+    NORMALIZED_FIELDS = ['email_key', 'phone_key', 'name_key', 'search_text']
+    
+    def refresh_normalized_fields(self):
+        """Recompute the blocking keys and search text from the contact fields."""
+        self.email_key = normalize_email(self.email)
+        self.phone_key = normalize_phone(self.phone)
+        if self.contact_type == 'company':
+            self.name_key = name_block_key(self.company_name)
+        else:
+            self.name_key = name_block_key(self.first_name, self.last_name)
+        self.search_text = normalize_search_text(
+            self.first_name, self.last_name, self.company_name, self.email_key,
+            self.phone_key, normalize_phone(self.mobile)
+        )
+    
+    def save(self, *args, **kwargs):
+        self.refresh_normalized_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.NORMALIZED_FIELDS)
+        super().save(*args, **kwargs)
 
 
-class Lead(BaseModel):
+class Lead(BaseModel, RelatedObjectsModel):
     """Lead model for potential customers."""
     
     STATUS_CHOICES = [
@@ -162,6 +232,10 @@ class Lead(BaseModel):
     estimated_value = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     probability = models.PositiveIntegerField(default=0, help_text="Probability of closing (0-100%)")
     
+    # Computed by the lead scoring job (0-100)
+    score = models.PositiveSmallIntegerField(default=0, editable=False)
+    scored_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     # Assignment and Dates
     assigned_to = models.ForeignKey(
         'authentication.User',
@@ -189,6 +263,15 @@ class Lead(BaseModel):
     )
     converted_at = models.DateTimeField(null=True, blank=True)
     
+    # Marketing
+    campaign = models.ForeignKey(
+        'Campaign',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='leads'
+    )
+    
     # Tags and Notes
     tags = models.ManyToManyField('core.Tag', blank=True)
     
@@ -199,6 +282,8 @@ class Lead(BaseModel):
             models.Index(fields=['status', 'assigned_to']),
             models.Index(fields=['organization', 'status']),
             models.Index(fields=['expected_close_date']),
+            models.Index(fields=['organization', 'assigned_to', '-created_at']),
+            models.Index(fields=['organization', '-score']),
         ]
     
     def __str__(self):
@@ -206,38 +291,52 @@ class Lead(BaseModel):
     
     @property
     def is_converted(self):
-        return self.converted_contact is not None or self.converted_opportunity is not None
-    
-    def convert_to_contact_and_opportunity(self, user):
-        """Convert lead to contact and opportunity."""
-        if self.is_converted:
-            return self.converted_contact, self.converted_opportunity
-        
-        # Create contact
-        contact = Contact.objects.create(
-            organization=self.organization,
-            first_name=self.contact_name.split()[0] if self.contact_name else '',
-            last_name=' '.join(self.contact_name.split()[1:]) if len(self.contact_name.split()) > 1 else '',
+        return self.converted_contact_id is not None or self.converted_opportunity_id is not None
+    
+    def build_converted_contact(self, user):
+        """Build (without saving) the contact created when converting this lead."""
+        name_parts = self.contact_name.split()
+        contact = Contact(
+            organization_id=self.organization_id,
+            first_name=name_parts[0] if name_parts else '',
+            last_name=' '.join(name_parts[1:]),
             company_name=self.company_name,
             email=self.email,
             phone=self.phone,
             source=self.source,
             created_by=user
         )
-        
-        # Create opportunity
-        opportunity = Opportunity.objects.create(
-            organization=self.organization,
+        contact.refresh_normalized_fields()
+        return contact
+    
+    def build_converted_opportunity(self, contact, user):
+        """Build (without saving) the opportunity created when converting this lead."""
+        return Opportunity(
+            organization_id=self.organization_id,
             name=self.title,
             contact=contact,
             description=self.description,
             stage='qualification',
-            estimated_value=self.estimated_value,
+            estimated_value=self.estimated_value or 0,
             probability=self.probability,
-            expected_close_date=self.expected_close_date,
-            assigned_to=self.assigned_to,
+            expected_close_date=self.expected_close_date or timezone.now().date(),
+            assigned_to_id=self.assigned_to_id,
+            campaign_id=self.campaign_id,
             created_by=user
         )
+    
+    def convert_to_contact_and_opportunity(self, user):
+        """Convert lead to contact and opportunity."""
+        if self.is_converted:
+            return self.converted_contact, self.converted_opportunity
+        
+        # Create contact
+        contact = self.build_converted_contact(user)
+        contact.save()
+        
+        # Create opportunity
+        opportunity = self.build_converted_opportunity(contact, user)
+        opportunity.save()
         
         # Update lead
         self.converted_contact = contact
@@ -247,9 +346,50 @@ class Lead(BaseModel):
         self.save()
         
         return contact, opportunity
+    
+    @classmethod
+    def bulk_convert(cls, leads, user):
+        """Convert many leads with three bulk statements instead of three per lead.
+        
+        Already converted leads are skipped. Returns the number converted.
+        """
+        leads = [
+            lead for lead in leads
+            if lead.converted_contact_id is None and lead.converted_opportunity_id is None
+        ]
+        if not leads:
+            return 0
+        
+        contacts = [lead.build_converted_contact(user) for lead in leads]
+        Contact.objects.bulk_create(contacts)
+        
+        opportunities = [
+            lead.build_converted_opportunity(contact, user)
+            for lead, contact in zip(leads, contacts)
+        ]
+        Opportunity.objects.bulk_create(opportunities)
+        OpportunityStageTransition.objects.bulk_create([
+            OpportunityStageTransition.for_opportunity(opportunity)
+            for opportunity in opportunities
+        ])
+        
+        now = timezone.now()
+        for lead, contact, opportunity in zip(leads, contacts, opportunities):
+            lead.converted_contact = contact
+            lead.converted_opportunity = opportunity
+            lead.converted_at = now
+            lead.status = 'qualified'
+            lead.updated_by = user
+            lead.updated_at = now
+        
+        cls.objects.bulk_update(
+            leads,
+            ['converted_contact', 'converted_opportunity', 'converted_at', 'status', 'updated_by', 'updated_at']
+        )
+        return len(leads)
 
 
-class Opportunity(BaseModel):
+class Opportunity(BaseModel, RelatedObjectsModel):
     """Opportunity model for sales opportunities."""
     
     STAGE_CHOICES = [
@@ -261,6 +401,9 @@ class Opportunity(BaseModel):
         ('closed_lost', 'Closed Lost'),
     ]
     
+    # Stages shown as columns on the sales pipeline, in display order
+    OPEN_STAGES = ['qualification', 'needs_analysis', 'proposal', 'negotiation']
+    
     PRIORITY_CHOICES = [
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -301,6 +444,13 @@ class Opportunity(BaseModel):
     # Competition and Source
     competitors = models.TextField(blank=True, help_text="List of competitors")
     lead_source = models.CharField(max_length=100, blank=True)
+    campaign = models.ForeignKey(
+        'Campaign',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='opportunities'
+    )
     
     # Tags
     tags = models.ManyToManyField('core.Tag', blank=True)
@@ -310,14 +460,42 @@ class Opportunity(BaseModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['stage', 'assigned_to']),
-            models.Index(fields=['organization', 'stage']),
+            models.Index(fields=['organization', 'stage', 'expected_close_date']),
             models.Index(fields=['expected_close_date']),
             models.Index(fields=['contact']),
+            models.Index(fields=['organization', 'assigned_to', '-created_at']),
         ]
     
     def __str__(self):
         return f"{self.name} - {self.contact.display_name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored stage so save() can record transitions
+        if 'stage' in field_names:
+            instance._loaded_stage = instance.stage
+        return instance
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        stage_saved = update_fields is None or 'stage' in update_fields
+        previous_stage = getattr(self, '_loaded_stage', None)
+        record_transition = stage_saved and (
+            adding or (hasattr(self, '_loaded_stage') and previous_stage != self.stage)
+        )
+        
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if record_transition:
+                OpportunityStageTransition.for_opportunity(
+                    self, '' if adding else previous_stage
+                ).save()
+        
+        if stage_saved:
+            self._loaded_stage = self.stage
+    
     @property
     def is_closed(self):
         return self.stage in ['closed_won', 'closed_lost']
@@ -338,6 +516,41 @@ class Opportunity(BaseModel):
         self.updated_by = user
         self.save()
     
+    @classmethod
+    def bulk_close(cls, queryset, stage, user, batch_size=1000):
+        """Close many opportunities with one update and one transition insert per batch.
+        
+        ``stage`` is ``closed_won`` or ``closed_lost``; opportunities already in
+        it are skipped. Returns the number closed.
+        """
+        rows = list(
+            queryset.exclude(stage=stage).order_by().values_list('id', 'organization_id', 'stage')
+        )
+        now = timezone.now()
+        
+        with transaction.atomic(using=queryset.db):
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cls.objects.filter(pk__in=[row[0] for row in batch]).update(
+                    stage=stage,
+                    probability=100 if stage == 'closed_won' else 0,
+                    actual_close_date=now.date(),
+                    updated_by=user,
+                    updated_at=now
+                )
+                OpportunityStageTransition.objects.bulk_create([
+                    OpportunityStageTransition(
+                        organization_id=organization_id,
+                        created_by=user,
+                        opportunity_id=opportunity_id,
+                        from_stage=from_stage,
+                        to_stage=stage,
+                        transitioned_at=now
+                    )
+                    for opportunity_id, organization_id, from_stage in batch
+                ])
+        return len(rows)
+    
     def close_as_lost(self, user, reason=''):
         """Close opportunity as lost."""
         self.stage = 'closed_lost'
@@ -355,12 +568,124 @@ class Opportunity(BaseModel):
                 organization=self.organization,
                 content=f"Opportunity closed as lost. Reason: {reason}",
                 content_type=ContentType.objects.get_for_model(self),
-                object_id=str(self.id),
+                object_id=self.id,
                 created_by=user
             )
 
 
-class Campaign(BaseModel):
+class CampaignQuerySet(models.QuerySet):
+    """QuerySet for campaigns with SQL-side performance annotations."""
+    
+    def with_performance(self):
+        """Annotate revenue, lead counts, conversion rate and ROI.
+        
+        Each figure is a correlated subquery on the campaign foreign keys,
+        so a page of campaigns costs a single query.
+        """
+        decimal_field = models.DecimalField(max_digits=15, decimal_places=2)
+        revenue = (
+            Opportunity.objects.filter(campaign=models.OuterRef('pk'), stage='closed_won')
+            .order_by()
+            .values('campaign')
+            .annotate(total=models.Sum('estimated_value'))
+            .values('total')
+        )
+        leads = (
+            Lead.objects.filter(campaign=models.OuterRef('pk'))
+            .order_by()
+            .values('campaign')
+            .annotate(total=models.Count('pk'))
+            .values('total')
+        )
+        converted_leads = leads.filter(converted_opportunity__isnull=False)
+        
+        return self.annotate(
+            revenue=Coalesce(models.Subquery(revenue, output_field=decimal_field), models.Value(0), output_field=decimal_field),
+            lead_count=Coalesce(models.Subquery(leads, output_field=models.IntegerField()), models.Value(0)),
+            converted_lead_count=Coalesce(models.Subquery(converted_leads, output_field=models.IntegerField()), models.Value(0)),
+        ).annotate(
+            conversion_rate=models.Case(
+                models.When(lead_count__gt=0, then=models.F('converted_lead_count') * 100.0 / models.F('lead_count')),
+                default=models.Value(0.0),
+                output_field=models.FloatField()
+            ),
+            roi_value=models.Case(
+                models.When(
+                    actual_cost__gt=0,
+                    then=(models.F('revenue') - models.F('actual_cost')) * 100 / models.F('actual_cost')
+                ),
+                default=models.Value(0),
+                output_field=decimal_field
+            ),
+        )
+
+
+class OpportunityStageTransition(BaseModel):
+    """Append-only record of an opportunity entering a stage."""
+    
+    opportunity = models.ForeignKey(
+        Opportunity,
+        on_delete=models.CASCADE,
+        related_name='stage_transitions'
+    )
+    from_stage = models.CharField(max_length=20, choices=Opportunity.STAGE_CHOICES, blank=True)
+    to_stage = models.CharField(max_length=20, choices=Opportunity.STAGE_CHOICES)
+    transitioned_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'crm_opportunity_stage_transitions'
+        ordering = ['transitioned_at']
+        indexes = [
+            models.Index(fields=['organization', 'transitioned_at']),
+            models.Index(fields=['opportunity', 'transitioned_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.opportunity_id}: {self.from_stage or '-'} -> {self.to_stage}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Opportunity stage transitions are append-only.')
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def for_opportunity(cls, opportunity, from_stage=''):
+        """Build the transition of ``opportunity`` into its current stage."""
+        return cls(
+            organization_id=opportunity.organization_id,
+            created_by_id=opportunity.updated_by_id or opportunity.created_by_id,
+            opportunity=opportunity,
+            from_stage=from_stage or '',
+            to_stage=opportunity.stage
+        )
+
+
+class OpportunityStageVelocity(BaseModel):
+    """Precomputed time-in-stage and conversion rollup per organization and stage."""
+    
+    stage = models.CharField(max_length=20, choices=Opportunity.STAGE_CHOICES)
+    period_days = models.PositiveIntegerField()
+    
+    entered_count = models.PositiveIntegerField(default=0)
+    exited_count = models.PositiveIntegerField(default=0)
+    advanced_count = models.PositiveIntegerField(default=0)
+    won_count = models.PositiveIntegerField(default=0)
+    lost_count = models.PositiveIntegerField(default=0)
+    
+    average_days_in_stage = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    conversion_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    
+    calculated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'crm_opportunity_stage_velocity'
+        unique_together = ['organization', 'stage']
+    
+    def __str__(self):
+        return f"{self.stage}: {self.average_days_in_stage} days"
+
+
+class Campaign(BaseModel, RelatedObjectsModel):
     """Marketing campaign model."""
     
     CAMPAIGN_TYPES = [
@@ -407,6 +732,8 @@ class Campaign(BaseModel):
     # Tags
     tags = models.ManyToManyField('core.Tag', blank=True)
     
+    objects = CampaignQuerySet.as_manager()
+    
     class Meta:
         db_table = 'crm_campaigns'
         ordering = ['-start_date']
@@ -429,18 +756,16 @@ class Campaign(BaseModel):
     @property
     def roi(self):
         """Calculate return on investment."""
+        if hasattr(self, 'roi_value'):
+            return self.roi_value
+        
         if not self.actual_cost or self.actual_cost == 0:
             return 0
         
-        # Calculate revenue from opportunities created by this campaign
-        revenue = sum(
-            opp.estimated_value for opp in 
-            Opportunity.objects.filter(
-                lead_source=self.name,
-                stage='closed_won',
-                organization=self.organization
-            )
-        )
+        # Calculate revenue from won opportunities linked to this campaign
+        revenue = self.opportunities.filter(stage='closed_won').aggregate(
+            total=models.Sum('estimated_value')
+        )['total'] or 0
         
         return ((revenue - self.actual_cost) / self.actual_cost) * 100
 
@@ -488,3 +813,116 @@ class EmailTemplate(BaseModel):
     
     def __str__(self):
         return self.name
+
+
+class CampaignEmailSend(BaseModel):
+    """One mass email send of a template to a campaign's recipients."""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        related_name='email_sends'
+    )
+    template = models.ForeignKey(
+        EmailTemplate,
+        on_delete=models.PROTECT,
+        related_name='campaign_sends'
+    )
+    from_email = models.EmailField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    
+    # Progress
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'crm_campaign_email_sends'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', 'campaign', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.campaign} - {self.template}"
+
+
+class CampaignEmailRecipient(BaseModel):
+    """Delivery status of a campaign email send for one contact."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    send = models.ForeignKey(
+        CampaignEmailSend,
+        on_delete=models.CASCADE,
+        related_name='recipients'
+    )
+    contact = models.ForeignKey(
+        Contact,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='campaign_emails'
+    )
+    email = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'crm_campaign_email_recipients'
+        indexes = [
+            models.Index(fields=['send', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.email} ({self.status})"
+
+
+class ContactDuplicate(BaseModel):
+    """Candidate duplicate pair found by the contact deduplication job."""
+    
+    # Merged pairs are deleted with the merged contact rather than kept
+    STATUS_CHOICES = [
+        ('pending', 'Pending Review'),
+        ('dismissed', 'Dismissed'),
+    ]
+    
+    contact = models.ForeignKey(
+        Contact,
+        on_delete=models.CASCADE,
+        related_name='duplicate_candidates'
+    )
+    duplicate = models.ForeignKey(
+        Contact,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    matched_on = models.JSONField(default=list)  # Blocking keys shared by the pair
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    class Meta:
+        db_table = 'crm_contact_duplicates'
+        ordering = ['-score']
+        unique_together = ['contact', 'duplicate']
+        indexes = [
+            models.Index(fields=['organization', 'status', 'score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.contact} ~ {self.duplicate} ({self.score})"
@@ -0,0 +1,132 @@
+"""
+Lead scoring engine.
+
+Leads are scored in chunks: one query loads the lead features, one
+grouped query counts their activities, NumPy computes every score of the
+chunk at once and changed scores are written back with ``bulk_update``.
+"""
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.core.models import Activity
+from .models import Lead
+
+SCORING_CHUNK_SIZE = 10000
+
+# Leads in these statuses are no longer worked and keep their last score
+UNSCORED_STATUSES = ['won', 'lost', 'cancelled']
+
+SOURCE_WEIGHTS = {
+    'referral': 1.0,
+    'partner': 0.9,
+    'trade_show': 0.7,
+    'website': 0.6,
+    'email_campaign': 0.5,
+    'social_media': 0.4,
+    'advertisement': 0.35,
+    'cold_call': 0.25,
+    'other': 0.3,
+}
+PRIORITY_WEIGHTS = {'urgent': 1.0, 'high': 0.75, 'medium': 0.5, 'low': 0.25}
+
+FEATURE_WEIGHTS = {
+    'source': 0.25,
+    'priority': 0.2,
+    'value': 0.2,
+    'activity': 0.25,
+    'recency': 0.1,
+}
+
+# Estimated value at which the value feature saturates
+VALUE_SATURATION = 1000000
+# Weighted activities (completed count double) at which engagement saturates
+ACTIVITY_SATURATION = 6
+# Days after which the recency feature has halved
+AGE_HALF_LIFE_DAYS = 30
+
+
+def compute_scores(sources, priorities, values, total_activities, completed_activities, ages):
+    """Return integer scores 0-100 for equally sized feature arrays."""
+    source = np.fromiter((SOURCE_WEIGHTS.get(item, SOURCE_WEIGHTS['other']) for item in sources), float, len(sources))
+    priority = np.fromiter((PRIORITY_WEIGHTS.get(item, 0.5) for item in priorities), float, len(priorities))
+    value = np.clip(np.log1p(values) / np.log1p(VALUE_SATURATION), 0, 1)
+    activity = np.clip((total_activities + completed_activities) / ACTIVITY_SATURATION, 0, 1)
+    recency = np.power(0.5, ages / AGE_HALF_LIFE_DAYS)
+
+    score = (
+        FEATURE_WEIGHTS['source'] * source
+        + FEATURE_WEIGHTS['priority'] * priority
+        + FEATURE_WEIGHTS['value'] * value
+        + FEATURE_WEIGHTS['activity'] * activity
+        + FEATURE_WEIGHTS['recency'] * recency
+    )
+    return np.rint(np.clip(score, 0, 1) * 100).astype(int)
+
+
+def score_lead_chunk(rows, activity_counts, now):
+    """Score ``(id, source, priority, estimated_value, created_at, score)`` rows."""
+    count = len(rows)
+    ids, sources, priorities, values, created, current = zip(*rows)
+    totals = np.zeros(count)
+    completed = np.zeros(count)
+    for index, lead_id in enumerate(ids):
+        total, done = activity_counts.get(lead_id, (0, 0))
+        totals[index] = total
+        completed[index] = done
+
+    scores = compute_scores(
+        sources,
+        priorities,
+        np.fromiter((float(value or 0) for value in values), float, count),
+        totals,
+        completed,
+        np.fromiter(((now - created_at).total_seconds() / 86400 for created_at in created), float, count),
+    )
+    return [
+        (lead_id, int(score))
+        for lead_id, score, previous in zip(ids, scores, current)
+        if previous != score
+    ]
+
+
+def score_leads(organization_id, chunk_size=SCORING_CHUNK_SIZE):
+    """Rescore the open leads of an organization; return the number changed."""
+    lead_content_type = ContentType.objects.get_for_model(Lead)
+    leads = Lead.objects.filter(organization_id=organization_id).exclude(
+        status__in=UNSCORED_STATUSES
+    ).order_by('pk')
+    now = timezone.now()
+    changed = 0
+    last_pk = None
+
+    while True:
+        chunk = leads if last_pk is None else leads.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list(
+            'id', 'source', 'priority', 'estimated_value', 'created_at', 'score'
+        )[:chunk_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        activity_counts = {
+            row['object_id']: (row['total'], row['completed'])
+            for row in Activity.objects.filter(
+                organization_id=organization_id,
+                content_type=lead_content_type,
+                object_id__in=[row[0] for row in rows]
+            ).order_by().values('object_id').annotate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status='completed'))
+            )
+        }
+
+        updates = [
+            Lead(pk=lead_id, score=score, scored_at=now)
+            for lead_id, score in score_lead_chunk(rows, activity_counts, now)
+        ]
+        Lead.objects.bulk_update(updates, ['score', 'scored_at'], batch_size=1000)
+        changed += len(updates)
+
+    return changed
@@ -0,0 +1,84 @@
+"""
+Contact search over the normalized ``Contact.search_text`` column.
+
+On PostgreSQL substring search is served by the trigram GIN index and
+prefix autocomplete by the ``simple`` tsvector expression index; other
+databases fall back to plain ``LIKE`` matching on the same column.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F
+from rest_framework import filters
+
+from .models import normalize_phone, normalize_search_text
+
+AUTOCOMPLETE_LIMIT = 10
+# Shorter queries return no suggestions
+AUTOCOMPLETE_MIN_LENGTH = 2
+# Prefix matches ranked per query
+AUTOCOMPLETE_CANDIDATES = 200
+
+PHONE_TERM_RE = re.compile(r'^\+?[\d\s().-]{3,}$')
+TSQUERY_SPECIAL_RE = re.compile(r"['\\:&|!()<>*]")
+
+
+def search_terms(value):
+    """Split a user query into normalized terms matching ``search_text``."""
+    if PHONE_TERM_RE.match(value.strip()):
+        return [normalize_phone(value)]
+    return normalize_search_text(value).split()
+
+
+def search_contacts(queryset, value):
+    """Filter contacts containing every term of ``value``."""
+    for term in search_terms(value):
+        queryset = queryset.filter(search_text__contains=term)
+    return queryset
+
+
+def autocomplete_contacts(queryset, value, limit=AUTOCOMPLETE_LIMIT):
+    """Return the best ``limit`` contacts whose words start with the query."""
+    terms = search_terms(value)
+    if not terms:
+        return queryset.none()
+
+    if connections[queryset.db].vendor != 'postgresql':
+        return search_contacts(queryset, value)[:limit]
+
+    tokens = [TSQUERY_SPECIAL_RE.sub('', term) for term in terms]
+    tokens = [token for token in tokens if token]
+    if not tokens:
+        return queryset.none()
+    query = SearchQuery(
+        ' & '.join(f"'{token}':*" for token in tokens),
+        config='simple',
+        search_type='raw'
+    )
+    if len(''.join(tokens)) < AUTOCOMPLETE_MIN_LENGTH:
+        return queryset.none()
+
+    vector = SearchVector('search_text', config='simple')
+    # Short prefixes match much of the table; only a bounded set of matches is ranked
+    candidates = (
+        queryset.annotate(search=vector).filter(search=query)
+        .order_by().values('pk')[:AUTOCOMPLETE_CANDIDATES]
+    )
+    return (
+        queryset.filter(pk__in=candidates)
+        .annotate(search=vector)
+        # F() ranks the annotated vector; a plain name would be re-vectorized
+        .annotate(rank=SearchRank(F('search'), query))
+        .order_by('-rank', 'first_name', 'last_name')[:limit]
+    )
+
+
+class ContactSearchFilter(filters.SearchFilter):
+    """``?search=`` backend matching the indexed normalized search column."""
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, '')
+        if not value.strip():
+            return queryset
+        return search_contacts(queryset, value)
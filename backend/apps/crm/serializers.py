@@ -3,7 +3,8 @@ Serializers for CRM module.
 """
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Contact, Lead, Opportunity, Campaign, SalesStage, EmailTemplate
+from .hierarchy import contact_ancestor_ids
+from .models import Contact, ContactDuplicate, CampaignEmailSend, OpportunityStageVelocity, Lead, Opportunity, Campaign, SalesStage, EmailTemplate
 
 User = get_user_model()
 
@@ -28,6 +29,13 @@ class ContactSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'full_name', 'display_name']
     
+    def validate_parent_contact(self, value):
+        if value is None or self.instance is None:
+            return value
+        if value.pk == self.instance.pk or self.instance.pk in contact_ancestor_ids(value):
+            raise serializers.ValidationError('A contact cannot be its own ancestor.')
+        return value
+    
     def create(self, validated_data):
         validated_data['organization'] = self.context['request'].user.organization
         validated_data['created_by'] = self.context['request'].user
@@ -49,6 +57,52 @@ class ContactListSerializer(serializers.ModelSerializer):
         ]
 
 
+class ContactAutocompleteSerializer(serializers.ModelSerializer):
+    """Minimal serializer for contact autocomplete results."""
+    
+    display_name = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Contact
+        fields = ['id', 'display_name', 'company_name', 'email']
+
+
+class ContactHierarchyNodeSerializer(serializers.Serializer):
+    """Serializer for one contact in an account hierarchy."""
+    
+    id = serializers.UUIDField()
+    parent_contact = serializers.UUIDField(allow_null=True)
+    depth = serializers.IntegerField()
+    contact_type = serializers.CharField()
+    display_name = serializers.CharField()
+    descendant_count = serializers.IntegerField()
+    
+    opportunity_count = serializers.IntegerField()
+    opportunity_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    rollup_opportunity_count = serializers.IntegerField()
+    rollup_opportunity_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    rollup_open_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    rollup_won_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class ContactDuplicateSerializer(serializers.ModelSerializer):
+    """Serializer for duplicate contact candidates."""
+    
+    contact = ContactListSerializer(read_only=True)
+    duplicate = ContactListSerializer(read_only=True)
+    
+    class Meta:
+        model = ContactDuplicate
+        fields = ['id', 'contact', 'duplicate', 'score', 'matched_on', 'status', 'created_at']
+        read_only_fields = fields
+
+
+class ContactMergeSerializer(serializers.Serializer):
+    """Serializer for merging duplicate contacts into one."""
+    
+    duplicate_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+
 class LeadSerializer(serializers.ModelSerializer):
     """Serializer for Lead model."""
     
@@ -63,14 +117,14 @@ class LeadSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'contact_name', 'company_name',
             'email', 'phone', 'status', 'priority', 'source', 'estimated_value',
-            'probability', 'assigned_to', 'expected_close_date', 'converted_contact',
-            'converted_opportunity', 'converted_at', 'tags', 'assigned_to_name',
+            'probability', 'score', 'scored_at', 'assigned_to', 'expected_close_date', 'converted_contact',
+            'converted_opportunity', 'converted_at', 'campaign', 'tags', 'assigned_to_name',
             'created_by_name', 'is_converted', 'converted_contact_name',
             'converted_opportunity_name', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'converted_contact', 'converted_opportunity', 'converted_at',
-            'is_converted', 'created_at', 'updated_at'
+            'id', 'score', 'scored_at', 'converted_contact', 'converted_opportunity',
+            'converted_at', 'is_converted', 'created_at', 'updated_at'
         ]
     
     def create(self, validated_data):
@@ -89,7 +143,7 @@ class LeadListSerializer(serializers.ModelSerializer):
         model = Lead
         fields = [
             'id', 'title', 'contact_name', 'company_name', 'email',
-            'status', 'priority', 'estimated_value', 'probability',
+            'status', 'priority', 'estimated_value', 'probability', 'score',
             'assigned_to_name', 'expected_close_date', 'is_converted',
             'created_at'
         ]
@@ -110,7 +164,7 @@ class OpportunitySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'description', 'contact', 'stage', 'priority',
             'estimated_value', 'probability', 'assigned_to', 'expected_close_date',
-            'actual_close_date', 'competitors', 'lead_source', 'tags',
+            'actual_close_date', 'competitors', 'lead_source', 'campaign', 'tags',
             'contact_name', 'assigned_to_name', 'created_by_name', 'is_closed',
             'is_won', 'weighted_value', 'created_at', 'updated_at'
         ]
@@ -145,6 +199,10 @@ class CampaignSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     is_active = serializers.ReadOnlyField()
     roi = serializers.ReadOnlyField()
+    revenue = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    lead_count = serializers.IntegerField(read_only=True)
+    converted_lead_count = serializers.IntegerField(read_only=True)
+    conversion_rate = serializers.FloatField(read_only=True)
     
     class Meta:
         model = Campaign
@@ -152,7 +210,8 @@ class CampaignSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'campaign_type', 'status',
             'start_date', 'end_date', 'budget', 'actual_cost',
             'assigned_to', 'tags', 'assigned_to_name', 'created_by_name',
-            'is_active', 'roi', 'created_at', 'updated_at'
+            'is_active', 'roi', 'revenue', 'lead_count', 'converted_lead_count',
+            'conversion_rate', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'is_active', 'roi', 'created_at', 'updated_at']
     
@@ -162,6 +221,35 @@ class CampaignSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class CampaignEmailSendSerializer(serializers.ModelSerializer):
+    """Serializer for campaign email sends and their progress."""
+    
+    template_name = serializers.CharField(source='template.name', read_only=True)
+    
+    class Meta:
+        model = CampaignEmailSend
+        fields = [
+            'id', 'campaign', 'template', 'template_name', 'from_email', 'status',
+            'total_recipients', 'sent_count', 'failed_count', 'started_at',
+            'completed_at', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class CampaignEmailSendRequestSerializer(serializers.Serializer):
+    """Serializer for starting a campaign email send."""
+    
+    template = serializers.UUIDField()
+    from_email = serializers.EmailField(required=False, allow_blank=True)
+    contact_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    tags = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    
+    def validate(self, attrs):
+        if not attrs.get('contact_ids') and not attrs.get('tags'):
+            raise serializers.ValidationError('Provide contact_ids or tags.')
+        return attrs
+
+
 class SalesStageSerializer(serializers.ModelSerializer):
     """Serializer for SalesStage model."""
     
@@ -211,6 +299,18 @@ class LeadConversionSerializer(serializers.Serializer):
     opportunity_expected_close_date = serializers.DateField(required=False)
 
 
+class BulkLeadConversionSerializer(serializers.Serializer):
+    """Serializer for bulk lead conversion requests."""
+    
+    lead_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    campaign = serializers.UUIDField(required=False)
+    
+    def validate(self, attrs):
+        if not attrs.get('lead_ids') and not attrs.get('campaign'):
+            raise serializers.ValidationError('Provide lead_ids or campaign.')
+        return attrs
+
+
 class OpportunityStageUpdateSerializer(serializers.Serializer):
     """Serializer for updating opportunity stage."""
     
@@ -246,4 +346,53 @@ class SalesPipelineSerializer(serializers.Serializer):
     count = serializers.IntegerField()
     total_value = serializers.DecimalField(max_digits=15, decimal_places=2)
     weighted_value = serializers.DecimalField(max_digits=15, decimal_places=2)
-    opportunities = OpportunityListSerializer(many=True)
+
+
+class SalesForecastQuerySerializer(serializers.Serializer):
+    """Query parameters for the sales forecast."""
+    
+    start = serializers.DateField(required=False, input_formats=['%Y-%m', '%Y-%m-%d'])
+    end = serializers.DateField(required=False, input_formats=['%Y-%m', '%Y-%m-%d'])
+    group_by = serializers.ChoiceField(choices=['assignee', 'stage'], required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['end'] < attrs['start']:
+            raise serializers.ValidationError('end must not be before start.')
+        return attrs
+
+
+class SalesForecastBucketSerializer(serializers.Serializer):
+    """Serializer for one assignee or stage within a forecast month."""
+    
+    key = serializers.CharField(allow_null=True)
+    label = serializers.CharField()
+    count = serializers.IntegerField()
+    pipeline_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    weighted_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    won_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class SalesForecastSerializer(serializers.Serializer):
+    """Serializer for one month of the sales forecast."""
+    
+    month = serializers.DateField()
+    count = serializers.IntegerField()
+    pipeline_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    weighted_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    won_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    breakdown = SalesForecastBucketSerializer(many=True, required=False)
+
+
+class OpportunityStageVelocitySerializer(serializers.ModelSerializer):
+    """Serializer for the precomputed stage velocity rollup."""
+    
+    stage_display = serializers.CharField(source='get_stage_display', read_only=True)
+    
+    class Meta:
+        model = OpportunityStageVelocity
+        fields = [
+            'stage', 'stage_display', 'period_days', 'entered_count', 'exited_count',
+            'advanced_count', 'won_count', 'lost_count', 'average_days_in_stage',
+            'conversion_rate', 'calculated_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,36 @@
+"""
+Signal handlers for CRM module.
+"""
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, pre_migrate
+from django.dispatch import receiver
+
+from apps.core.counters import track_record_count
+from apps.core.queries import register_query_model
+from .models import Contact, Lead, Opportunity, Campaign
+from .stats import invalidate_crm_stats
+
+
+for model in (Contact, Lead, Opportunity, Campaign):
+    track_record_count(model)
+    register_query_model(model)
+
+
+@receiver([post_save, post_delete], sender=Contact)
+@receiver([post_save, post_delete], sender=Lead)
+@receiver([post_save, post_delete], sender=Opportunity)
+@receiver([post_save, post_delete], sender=Campaign)
+def invalidate_crm_stats_on_write(sender, instance, **kwargs):
+    """Drop the cached CRM statistics of the record's organization."""
+    invalidate_crm_stats(instance.organization_id)
+
+
+@receiver(pre_migrate)
+def create_trigram_extension(sender, using, **kwargs):
+    """Contact search indexes use ``gin_trgm_ops`` from the pg_trgm extension."""
+    if sender.name != 'apps.crm':
+        return
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
@@ -0,0 +1,85 @@
+"""
+Cached CRM headline statistics.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+
+from .models import Contact, Lead, Opportunity, Campaign
+
+CRM_STATS_CACHE_TIMEOUT = 60
+
+
+def crm_stats_cache_key(organization_id):
+    return f'crm:stats:{organization_id}'
+
+
+def weighted_value_sum(**kwargs):
+    """Aggregate of estimated_value weighted by each row's own probability."""
+    return Sum(F('estimated_value') * F('probability') / 100, **kwargs)
+
+
+def compute_crm_stats(organization):
+    """Build CRM statistics with one conditional-aggregate query per model."""
+    open_stages = Q(stage__in=Opportunity.OPEN_STAGES)
+    won = Q(stage='closed_won')
+
+    lead_stats = Lead.objects.filter(organization=organization).aggregate(
+        total=Count('id'),
+        converted=Count('id', filter=Q(converted_opportunity__isnull=False)),
+        **{
+            f'status_{value}': Count('id', filter=Q(status=value))
+            for value, label in Lead.STATUS_CHOICES
+        }
+    )
+
+    opportunity_stats = Opportunity.objects.filter(organization=organization).aggregate(
+        total=Count('id'),
+        pipeline_value=Sum('estimated_value', filter=open_stages),
+        weighted_pipeline_value=weighted_value_sum(filter=open_stages),
+        won_count=Count('id', filter=won),
+        won_value=Sum('estimated_value', filter=won),
+        **{
+            f'stage_{value}': Count('id', filter=Q(stage=value))
+            for value, label in Opportunity.STAGE_CHOICES
+        }
+    )
+
+    total_contacts = Contact.objects.filter(organization=organization, is_active=True).count()
+    total_campaigns = Campaign.objects.filter(organization=organization).count()
+
+    total_leads = lead_stats['total']
+    won_count = opportunity_stats['won_count']
+    won_value = opportunity_stats['won_value'] or 0
+
+    return {
+        'total_contacts': total_contacts,
+        'total_leads': total_leads,
+        'total_opportunities': opportunity_stats['total'],
+        'total_campaigns': total_campaigns,
+        'leads_by_status': {
+            value: lead_stats[f'status_{value}'] for value, label in Lead.STATUS_CHOICES
+        },
+        'opportunities_by_stage': {
+            value: opportunity_stats[f'stage_{value}'] for value, label in Opportunity.STAGE_CHOICES
+        },
+        'total_pipeline_value': opportunity_stats['pipeline_value'] or 0,
+        'weighted_pipeline_value': opportunity_stats['weighted_pipeline_value'] or 0,
+        'won_opportunities_count': won_count,
+        'won_opportunities_value': won_value,
+        'conversion_rate': (lead_stats['converted'] / total_leads * 100) if total_leads > 0 else 0,
+        'average_deal_size': won_value / won_count if won_count > 0 else 0,
+    }
+
+
+def get_crm_stats(organization):
+    """Return CRM statistics for an organization, computing them on a cache miss."""
+    key = crm_stats_cache_key(organization.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_crm_stats(organization)
+        cache.set(key, stats, CRM_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_crm_stats(organization_id):
+    cache.delete(crm_stats_cache_key(organization_id))
@@ -0,0 +1,187 @@
+"""
+Background tasks for CRM module.
+"""
+import smtplib
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.template import TemplateSyntaxError
+from django.utils import timezone
+
+from .dedup import refresh_duplicate_candidates
+from .mailing import create_recipients, deliver_recipients, fail_recipients
+from .models import CampaignEmailSend, Contact, Lead, OpportunityStageTransition
+from .scoring import score_leads
+from .stats import invalidate_crm_stats
+from .velocity import refresh_stage_velocity
+
+BULK_CONVERSION_CHUNK_SIZE = 500
+CONTACT_REFRESH_BATCH_SIZE = 1000
+
+
+def unconverted_leads(organization_id, lead_ids=None, campaign_id=None):
+    """Unconverted leads of an organization, optionally limited to ids or a campaign."""
+    leads = Lead.objects.filter(
+        organization_id=organization_id,
+        converted_contact__isnull=True,
+        converted_opportunity__isnull=True
+    )
+    if lead_ids:
+        leads = leads.filter(pk__in=lead_ids)
+    if campaign_id:
+        leads = leads.filter(campaign_id=campaign_id)
+    return leads
+
+
+@shared_task(bind=True)
+def bulk_convert_leads_task(self, organization_id, user_id, lead_ids=None, campaign_id=None):
+    """Convert matching leads in primary key chunks, reporting progress through the task state."""
+    user = get_user_model().objects.filter(pk=user_id).first()
+    leads = unconverted_leads(organization_id, lead_ids, campaign_id)
+    total = leads.count()
+    processed = 0
+    converted = 0
+    last_pk = None
+    
+    while True:
+        with transaction.atomic():
+            chunk = leads if last_pk is None else leads.filter(pk__gt=last_pk)
+            chunk_ids = list(chunk.order_by('pk').values_list('pk', flat=True)[:BULK_CONVERSION_CHUNK_SIZE])
+            if not chunk_ids:
+                break
+            locked = list(
+                leads.select_for_update(skip_locked=True).filter(pk__in=chunk_ids)
+            )
+            converted += Lead.bulk_convert(locked, user)
+        
+        last_pk = chunk_ids[-1]
+        processed += len(chunk_ids)
+        self.update_state(state='PROGRESS', meta={
+            'organization_id': str(organization_id),
+            'total': total,
+            'processed': processed,
+            'converted': converted,
+        })
+    
+    invalidate_crm_stats(organization_id)
+    
+    return {
+        'organization_id': str(organization_id),
+        'total': total,
+        'processed': processed,
+        'converted': converted,
+    }
+
+
+@shared_task
+def find_duplicate_contacts_task(organization_id):
+    """Rebuild the pending duplicate contact candidates for an organization."""
+    return {
+        'organization_id': str(organization_id),
+        'candidates': refresh_duplicate_candidates(organization_id),
+    }
+
+
+@shared_task
+def refresh_contact_normalized_fields_task(organization_id):
+    """Backfill contact blocking keys and search text in batches."""
+    contacts = Contact.objects.filter(organization_id=organization_id).order_by('pk')
+    refreshed = 0
+    last_pk = None
+    
+    while True:
+        batch = contacts if last_pk is None else contacts.filter(pk__gt=last_pk)
+        batch = list(batch[:CONTACT_REFRESH_BATCH_SIZE])
+        if not batch:
+            break
+        for contact in batch:
+            contact.refresh_normalized_fields()
+        Contact.objects.bulk_update(batch, Contact.NORMALIZED_FIELDS)
+        refreshed += len(batch)
+        last_pk = batch[-1].pk
+    
+    return {'organization_id': str(organization_id), 'refreshed': refreshed}
+
+
+@shared_task
+def prepare_campaign_email_send_task(send_id, contact_ids=None, tag_ids=None):
+    """Store the recipients of a campaign email send and queue delivery batches."""
+    send = CampaignEmailSend.objects.get(pk=send_id)
+    contacts = Contact.objects.filter(
+        organization_id=send.organization_id, is_active=True
+    ).exclude(email='')
+    if contact_ids:
+        contacts = contacts.filter(pk__in=contact_ids)
+    if tag_ids:
+        contacts = contacts.filter(tags__in=tag_ids).distinct()
+    
+    now = timezone.now()
+    with transaction.atomic():
+        batches = create_recipients(send, contacts.order_by('created_at'))
+        total = sum(len(batch) for batch in batches)
+        CampaignEmailSend.objects.filter(pk=send.pk).update(
+            total_recipients=total,
+            status='sending' if total else 'completed',
+            started_at=now,
+            completed_at=None if total else now,
+            updated_at=now
+        )
+    
+    for batch in batches:
+        deliver_campaign_email_batch_task.delay(str(send.pk), batch)
+    
+    return {'send_id': str(send.pk), 'total': total, 'batches': len(batches)}
+
+
+@shared_task(bind=True, max_retries=3)
+def deliver_campaign_email_batch_task(self, send_id, recipient_ids):
+    """Deliver one batch of a campaign email send over a single connection."""
+    send = CampaignEmailSend.objects.select_related('campaign', 'template').get(pk=send_id)
+    
+    try:
+        sent, failed = deliver_recipients(send, recipient_ids)
+    except TemplateSyntaxError as exc:
+        # Retrying cannot fix the template
+        failed = fail_recipients(send, recipient_ids, f'Invalid email template: {exc}')
+        return {'send_id': str(send_id), 'sent': 0, 'failed': failed}
+    except (smtplib.SMTPException, OSError) as exc:
+        if self.request.retries >= self.max_retries:
+            failed = fail_recipients(send, recipient_ids, str(exc))
+            return {'send_id': str(send_id), 'sent': 0, 'failed': failed}
+        raise self.retry(exc=exc, countdown=60 * 2 ** self.request.retries)
+    
+    return {'send_id': str(send_id), 'sent': sent, 'failed': failed}
+
+
+@shared_task
+def refresh_stage_velocity_task(organization_id=None):
+    """Refresh the stage velocity rollup of one or every organization with transitions."""
+    if organization_id:
+        organization_ids = [organization_id]
+    else:
+        organization_ids = (
+            OpportunityStageTransition.objects.order_by()
+            .values_list('organization_id', flat=True)
+            .distinct()
+        )
+    
+    refreshed = 0
+    for org_id in organization_ids:
+        refresh_stage_velocity(org_id)
+        refreshed += 1
+    return {'refreshed': refreshed}
+
+
+@shared_task
+def score_leads_task(organization_id=None):
+    """Rescore open leads of one or every organization."""
+    if organization_id:
+        organization_ids = [organization_id]
+    else:
+        organization_ids = Lead.objects.order_by().values_list('organization_id', flat=True).distinct()
+    
+    changed = 0
+    for org_id in organization_ids:
+        changed += score_leads(org_id)
+    return {'changed': changed}
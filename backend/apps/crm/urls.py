@@ -10,22 +10,32 @@ urlpatterns = [
     # Contacts
     path('contacts/', views.ContactListCreateView.as_view(), name='contact_list_create'),
     path('contacts/<uuid:pk>/', views.ContactDetailView.as_view(), name='contact_detail'),
+    path('contacts/autocomplete/', views.contact_autocomplete_view, name='contact_autocomplete'),
+    path('contacts/<uuid:pk>/hierarchy/', views.contact_hierarchy_view, name='contact_hierarchy'),
+    path('contacts/<uuid:pk>/merge/', views.merge_contacts_view, name='merge_contacts'),
+    path('contacts/duplicates/', views.ContactDuplicateListView.as_view(), name='contact_duplicates'),
+    path('contacts/duplicates/scan/', views.find_contact_duplicates_view, name='find_contact_duplicates'),
+    path('contacts/duplicates/<uuid:pk>/dismiss/', views.dismiss_contact_duplicate_view, name='dismiss_contact_duplicate'),
     
     # Leads
     path('leads/', views.LeadListCreateView.as_view(), name='lead_list_create'),
     path('leads/<uuid:pk>/', views.LeadDetailView.as_view(), name='lead_detail'),
     path('leads/<uuid:pk>/convert/', views.convert_lead_view, name='convert_lead'),
-    path('leads/my/', views.my_leads_view, name='my_leads'),
+    path('leads/my/', views.MyLeadListView.as_view(), name='my_leads'),
+    path('leads/bulk-convert/', views.bulk_convert_leads_view, name='bulk_convert_leads'),
+    path('leads/bulk-convert/<uuid:task_id>/', views.bulk_convert_leads_status_view, name='bulk_convert_leads_status'),
     
     # Opportunities
     path('opportunities/', views.OpportunityListCreateView.as_view(), name='opportunity_list_create'),
     path('opportunities/<uuid:pk>/', views.OpportunityDetailView.as_view(), name='opportunity_detail'),
     path('opportunities/<uuid:pk>/stage/', views.update_opportunity_stage_view, name='update_opportunity_stage'),
-    path('opportunities/my/', views.my_opportunities_view, name='my_opportunities'),
+    path('opportunities/my/', views.MyOpportunityListView.as_view(), name='my_opportunities'),
     
     # Campaigns
     path('campaigns/', views.CampaignListCreateView.as_view(), name='campaign_list_create'),
     path('campaigns/<uuid:pk>/', views.CampaignDetailView.as_view(), name='campaign_detail'),
+    path('campaigns/<uuid:pk>/send-email/', views.send_campaign_email_view, name='send_campaign_email'),
+    path('campaigns/<uuid:pk>/email-sends/', views.CampaignEmailSendListView.as_view(), name='campaign_email_sends'),
     
     # Sales Stages
     path('sales-stages/', views.SalesStageListCreateView.as_view(), name='sales_stage_list_create'),
@@ -38,6 +48,9 @@ urlpatterns = [
     # Analytics and Reports
     path('stats/', views.crm_stats_view, name='crm_stats'),
     path('pipeline/', views.sales_pipeline_view, name='sales_pipeline'),
-    path('activities/overdue/', views.overdue_activities_view, name='overdue_activities'),
+    path('pipeline/velocity/', views.pipeline_velocity_view, name='pipeline_velocity'),
+    path('forecast/', views.sales_forecast_view, name='sales_forecast'),
+    path('pipeline/<str:stage>/opportunities/', views.PipelineStageOpportunityListView.as_view(), name='pipeline_stage_opportunities'),
+    path('activities/overdue/', views.OverdueActivityListView.as_view(), name='overdue_activities'),
     path('activities/recent/', views.recent_activities_view, name='recent_activities'),
 ]
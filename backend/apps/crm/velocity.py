@@ -0,0 +1,117 @@
+"""
+Pipeline velocity analytics over opportunity stage transitions.
+
+Each transition is paired with the opportunity's next one using the
+``LEAD()`` window function, which gives the time spent in the stage and
+the stage it moved to. Results are stored in ``OpportunityStageVelocity``
+so dashboards read a handful of precomputed rows.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Opportunity, OpportunityStageTransition, OpportunityStageVelocity
+
+VELOCITY_PERIOD_DAYS = 365
+
+# Days between two timestamps, per database vendor
+DURATION_DAYS_SQL = {
+    'postgresql': 'EXTRACT(EPOCH FROM (next_at - transitioned_at)) / 86400.0',
+    'sqlite': 'julianday(next_at) - julianday(transitioned_at)',
+}
+
+VELOCITY_SQL = """
+WITH transitions AS (
+    SELECT
+        to_stage AS stage,
+        transitioned_at,
+        LEAD(to_stage) OVER stage_window AS next_stage,
+        LEAD(transitioned_at) OVER stage_window AS next_at
+    FROM crm_opportunity_stage_transitions
+    WHERE organization_id = %s AND transitioned_at >= %s
+    WINDOW stage_window AS (PARTITION BY opportunity_id ORDER BY transitioned_at, id)
+)
+SELECT
+    stage,
+    next_stage,
+    COUNT(*),
+    COALESCE(SUM(CASE WHEN next_at IS NOT NULL THEN {duration} END), 0)
+FROM transitions
+GROUP BY stage, next_stage
+"""
+
+STAGE_ORDER = {stage: index for index, (stage, label) in enumerate(Opportunity.STAGE_CHOICES)}
+
+
+def _empty_stage(stage):
+    return {
+        'stage': stage,
+        'entered_count': 0,
+        'exited_count': 0,
+        'advanced_count': 0,
+        'won_count': 0,
+        'lost_count': 0,
+        'total_days': 0.0,
+    }
+
+
+def compute_stage_velocity(organization_id, period_days=VELOCITY_PERIOD_DAYS):
+    """Return time-in-stage and conversion figures for each open stage."""
+    connection = connections[OpportunityStageTransition.objects.db]
+    since = timezone.now() - timedelta(days=period_days)
+    sql = VELOCITY_SQL.format(duration=DURATION_DAYS_SQL[connection.vendor])
+    params = [
+        OpportunityStageTransition._meta.pk.get_db_prep_value(organization_id, connection),
+        OpportunityStageTransition._meta.get_field('transitioned_at').get_db_prep_value(since, connection),
+    ]
+
+    stages = {stage: _empty_stage(stage) for stage in Opportunity.OPEN_STAGES}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for stage, next_stage, count, total_days in cursor.fetchall():
+            if stage not in stages:
+                continue
+            row = stages[stage]
+            row['entered_count'] += count
+            if next_stage is None:
+                continue
+            row['exited_count'] += count
+            row['total_days'] += float(total_days)
+            if next_stage == 'closed_won':
+                row['won_count'] += count
+            elif next_stage == 'closed_lost':
+                row['lost_count'] += count
+            if next_stage != 'closed_lost' and STAGE_ORDER[next_stage] > STAGE_ORDER[stage]:
+                row['advanced_count'] += count
+
+    results = []
+    for stage in Opportunity.OPEN_STAGES:
+        row = stages[stage]
+        exited = row['exited_count']
+        total_days = row.pop('total_days')
+        row['average_days_in_stage'] = Decimal(total_days / exited if exited else 0).quantize(Decimal('0.01'))
+        row['conversion_rate'] = Decimal(
+            row['advanced_count'] / exited * 100 if exited else 0
+        ).quantize(Decimal('0.01'))
+        results.append(row)
+    return results
+
+
+def refresh_stage_velocity(organization_id, period_days=VELOCITY_PERIOD_DAYS):
+    """Recompute and store the velocity rollup of an organization."""
+    now = timezone.now()
+    rollup = [
+        OpportunityStageVelocity(
+            organization_id=organization_id,
+            period_days=period_days,
+            calculated_at=now,
+            **row
+        )
+        for row in compute_stage_velocity(organization_id, period_days)
+    ]
+    with transaction.atomic():
+        OpportunityStageVelocity.objects.filter(organization_id=organization_id).delete()
+        OpportunityStageVelocity.objects.bulk_create(rollup)
+    return rollup
@@ -5,17 +5,45 @@ from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Sum, Count, Avg
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-
-from .models import Contact, Lead, Opportunity, Campaign, SalesStage, EmailTemplate
+from django.db import transaction
+from django.template import TemplateSyntaxError
+from celery.result import AsyncResult
+
+from apps.core.activities import content_type_ids, overdue_activities
+from apps.core.models import Activity
+from apps.core.pagination import CreatedAtCursorPagination
+from apps.core.serializers import ActivitySerializer
+
+from .dedup import merge_contacts
+from .forecast import MAX_FORECAST_MONTHS, add_months, compute_forecast
+from .hierarchy import MAX_HIERARCHY_DEPTH, contact_hierarchy
+from .mailing import compile_email_template
+from .models import (
+    Contact, ContactDuplicate, Lead, Opportunity, OpportunityStageVelocity, Campaign,
+    CampaignEmailSend, SalesStage, EmailTemplate
+)
 from .serializers import (
-    ContactSerializer, ContactListSerializer, LeadSerializer, LeadListSerializer,
+    ContactSerializer, ContactListSerializer, ContactAutocompleteSerializer, ContactHierarchyNodeSerializer,
+    ContactDuplicateSerializer, ContactMergeSerializer,
+    LeadSerializer, LeadListSerializer,
     OpportunitySerializer, OpportunityListSerializer, CampaignSerializer,
+    CampaignEmailSendSerializer, CampaignEmailSendRequestSerializer,
     SalesStageSerializer, EmailTemplateSerializer, LeadConversionSerializer,
-    OpportunityStageUpdateSerializer, CRMStatsSerializer, SalesPipelineSerializer
+    BulkLeadConversionSerializer,
+    OpportunityStageUpdateSerializer, CRMStatsSerializer, SalesPipelineSerializer,
+    SalesForecastQuerySerializer, SalesForecastSerializer, OpportunityStageVelocitySerializer
+)
+from .search import ContactSearchFilter, autocomplete_contacts
+from .stats import get_crm_stats, weighted_value_sum
+from .velocity import refresh_stage_velocity
+from .tasks import (
+    bulk_convert_leads_task, find_duplicate_contacts_task, prepare_campaign_email_send_task,
+    unconverted_leads
 )
 
 
@@ -23,9 +51,8 @@ class ContactListCreateView(generics.ListCreateAPIView):
     """List and create contacts."""
     
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ContactSearchFilter, filters.OrderingFilter]
     filterset_fields = ['contact_type', 'is_active', 'industry']
-    search_fields = ['first_name', 'last_name', 'company_name', 'email', 'phone']
     ordering_fields = ['first_name', 'last_name', 'company_name', 'created_at']
     ordering = ['-created_at']
     
@@ -48,14 +75,127 @@ class ContactDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Contact.objects.filter(organization=self.request.user.organization)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def contact_autocomplete_view(request):
+    """Return the top contacts whose names, company, email or phone start with ``q``."""
+    
+    contacts = autocomplete_contacts(
+        Contact.objects.filter(organization=request.user.organization, is_active=True).only(
+            'id', 'contact_type', 'first_name', 'last_name', 'company_name', 'email'
+        ),
+        request.query_params.get('q', '')
+    )
+    return Response(ContactAutocompleteSerializer(contacts, many=True).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def contact_hierarchy_view(request, pk):
+    """Get a contact's descendants or ancestors with rolled-up opportunity totals."""
+    
+    contact = get_object_or_404(Contact, pk=pk, organization=request.user.organization)
+    
+    direction = request.query_params.get('direction', 'descendants')
+    if direction not in ('descendants', 'ancestors'):
+        return Response(
+            {'error': 'direction must be descendants or ancestors'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        max_depth = int(request.query_params.get('max_depth', MAX_HIERARCHY_DEPTH))
+    except ValueError:
+        return Response({'error': 'max_depth must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    max_depth = min(max(max_depth, 0), MAX_HIERARCHY_DEPTH)
+    
+    nodes = contact_hierarchy(contact, direction, max_depth)
+    
+    return Response({
+        'direction': direction,
+        'max_depth': max_depth,
+        'nodes': ContactHierarchyNodeSerializer(nodes, many=True).data
+    })
+
+
+class ContactDuplicateListView(generics.ListAPIView):
+    """List duplicate contact candidates, best matches first."""
+    
+    serializer_class = ContactDuplicateSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status']
+    ordering_fields = ['score', 'created_at']
+    ordering = ['-score']
+    
+    def get_queryset(self):
+        return ContactDuplicate.objects.filter(
+            organization=self.request.user.organization
+        ).select_related('contact', 'duplicate')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def find_contact_duplicates_view(request):
+    """Queue a duplicate scan over the organization's contacts."""
+    
+    task = find_duplicate_contacts_task.delay(str(request.user.organization_id))
+    return Response({
+        'message': 'Duplicate scan queued',
+        'task_id': task.id
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def dismiss_contact_duplicate_view(request, pk):
+    """Mark a duplicate candidate as not a duplicate."""
+    
+    candidate = get_object_or_404(ContactDuplicate, pk=pk, organization=request.user.organization)
+    candidate.status = 'dismissed'
+    candidate.updated_by = request.user
+    candidate.save(update_fields=['status', 'updated_by', 'updated_at'])
+    return Response(ContactDuplicateSerializer(candidate).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def merge_contacts_view(request, pk):
+    """Merge duplicate contacts into the given contact."""
+    
+    primary = get_object_or_404(Contact, pk=pk, organization=request.user.organization)
+    
+    serializer = ContactMergeSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    duplicate_ids = set(serializer.validated_data['duplicate_ids']) - {primary.pk}
+    duplicates = list(Contact.objects.filter(
+        organization=request.user.organization, pk__in=duplicate_ids
+    ))
+    if not duplicates or len(duplicates) != len(duplicate_ids):
+        return Response(
+            {'error': 'Duplicate contacts not found'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    merged = merge_contacts(primary, duplicates, request.user)
+    
+    return Response({
+        'message': 'Contacts merged successfully',
+        'merged': merged,
+        'contact': ContactSerializer(primary, context={'request': request}).data
+    })
+
+
 class LeadListCreateView(generics.ListCreateAPIView):
     """List and create leads."""
     
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['status', 'priority', 'source', 'assigned_to']
+    filterset_fields = ['status', 'priority', 'source', 'assigned_to', 'campaign']
     search_fields = ['title', 'contact_name', 'company_name', 'email']
-    ordering_fields = ['title', 'contact_name', 'estimated_value', 'expected_close_date', 'created_at']
+    ordering_fields = ['title', 'contact_name', 'estimated_value', 'score', 'expected_close_date', 'created_at']
     ordering = ['-created_at']
     
     def get_queryset(self):
@@ -82,7 +222,7 @@ class OpportunityListCreateView(generics.ListCreateAPIView):
     
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['stage', 'priority', 'assigned_to', 'contact']
+    filterset_fields = ['stage', 'priority', 'assigned_to', 'contact', 'campaign']
     search_fields = ['name', 'description', 'contact__first_name', 'contact__last_name', 'contact__company_name']
     ordering_fields = ['name', 'estimated_value', 'probability', 'expected_close_date', 'created_at']
     ordering = ['-created_at']
@@ -114,11 +254,16 @@ class CampaignListCreateView(generics.ListCreateAPIView):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['campaign_type', 'status', 'assigned_to']
     search_fields = ['name', 'description']
-    ordering_fields = ['name', 'start_date', 'end_date', 'budget', 'created_at']
+    ordering_fields = [
+        'name', 'start_date', 'end_date', 'budget', 'revenue', 'lead_count',
+        'conversion_rate', 'roi_value', 'created_at'
+    ]
     ordering = ['-start_date']
     
     def get_queryset(self):
-        return Campaign.objects.filter(organization=self.request.user.organization)
+        return Campaign.objects.filter(
+            organization=self.request.user.organization
+        ).select_related('assigned_to', 'created_by').prefetch_related('tags').with_performance()
 
 
 class CampaignDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -128,7 +273,69 @@ class CampaignDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Campaign.objects.filter(organization=self.request.user.organization)
+        return Campaign.objects.filter(
+            organization=self.request.user.organization
+        ).with_performance()
+
+
+class CampaignEmailSendListView(generics.ListAPIView):
+    """List email sends of a campaign with delivery progress."""
+    
+    serializer_class = CampaignEmailSendSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return CampaignEmailSend.objects.filter(
+            organization=self.request.user.organization,
+            campaign_id=self.kwargs['pk']
+        ).select_related('template')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def send_campaign_email_view(request, pk):
+    """Queue an email template send to campaign recipients."""
+    
+    campaign = get_object_or_404(Campaign, pk=pk, organization=request.user.organization)
+    
+    serializer = CampaignEmailSendRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    template = EmailTemplate.objects.filter(
+        pk=serializer.validated_data['template'],
+        organization=request.user.organization,
+        is_active=True
+    ).first()
+    if template is None:
+        return Response(
+            {'error': 'Email template not found'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        compile_email_template(template)
+    except TemplateSyntaxError as exc:
+        return Response(
+            {'error': f'Invalid email template: {exc}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    send = CampaignEmailSend.objects.create(
+        organization=request.user.organization,
+        created_by=request.user,
+        campaign=campaign,
+        template=template,
+        from_email=serializer.validated_data.get('from_email', '')
+    )
+    contact_ids = serializer.validated_data.get('contact_ids')
+    tag_ids = serializer.validated_data.get('tags')
+    transaction.on_commit(lambda: prepare_campaign_email_send_task.delay(
+        str(send.pk),
+        [str(pk) for pk in contact_ids] if contact_ids else None,
+        [str(pk) for pk in tag_ids] if tag_ids else None
+    ))
+    
+    return Response(CampaignEmailSendSerializer(send).data, status=status.HTTP_202_ACCEPTED)
 
 
 class SalesStageListCreateView(generics.ListCreateAPIView):
@@ -201,6 +408,57 @@ def convert_lead_view(request, pk):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_convert_leads_view(request):
+    """Queue conversion of many leads to contacts and opportunities."""
+    
+    serializer = BulkLeadConversionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    lead_ids = serializer.validated_data.get('lead_ids')
+    campaign_id = serializer.validated_data.get('campaign')
+    lead_ids = [str(pk) for pk in lead_ids] if lead_ids else None
+    campaign_id = str(campaign_id) if campaign_id else None
+    
+    if not unconverted_leads(request.user.organization_id, lead_ids, campaign_id).exists():
+        return Response(
+            {'error': 'No unconverted leads matched'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # The task reads the matching leads itself, so the message stays small
+    task = bulk_convert_leads_task.delay(
+        str(request.user.organization_id), str(request.user.pk), lead_ids, campaign_id
+    )
+    
+    return Response({
+        'message': 'Lead conversion queued',
+        'task_id': task.id
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bulk_convert_leads_status_view(request, task_id):
+    """Report progress of a bulk lead conversion."""
+    
+    result = AsyncResult(str(task_id))
+    info = result.info if isinstance(result.info, dict) else {}
+    
+    if info.get('organization_id') not in (None, str(request.user.organization_id)):
+        return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'task_id': result.id,
+        'state': result.state,
+        'total': info.get('total'),
+        'processed': info.get('processed', 0),
+        'converted': info.get('converted', 0),
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_opportunity_stage_view(request, pk):
@@ -235,69 +493,7 @@ def update_opportunity_stage_view(request, pk):
 def crm_stats_view(request):
     """Get CRM statistics."""
     
-    organization = request.user.organization
-    
-    # Basic counts
-    total_contacts = Contact.objects.filter(organization=organization, is_active=True).count()
-    total_leads = Lead.objects.filter(organization=organization).count()
-    total_opportunities = Opportunity.objects.filter(organization=organization).count()
-    total_campaigns = Campaign.objects.filter(organization=organization).count()
-    
-    # Leads by status
-    leads_by_status = dict(
-        Lead.objects.filter(organization=organization)
-        .values('status')
-        .annotate(count=Count('id'))
-        .values_list('status', 'count')
-    )
-    
-    # Opportunities by stage
-    opportunities_by_stage = dict(
-        Opportunity.objects.filter(organization=organization)
-        .values('stage')
-        .annotate(count=Count('id'))
-        .values_list('stage', 'count')
-    )
-    
-    # Pipeline values
-    pipeline_stats = Opportunity.objects.filter(
-        organization=organization,
-        stage__in=['qualification', 'needs_analysis', 'proposal', 'negotiation']
-    ).aggregate(
-        total_value=Sum('estimated_value'),
-        weighted_value=Sum('estimated_value') * Sum('probability') / 100 if Sum('probability') else 0
-    )
-    
-    # Won opportunities
-    won_stats = Opportunity.objects.filter(
-        organization=organization,
-        stage='closed_won'
-    ).aggregate(
-        count=Count('id'),
-        total_value=Sum('estimated_value')
-    )
-    
-    # Conversion rate (leads to opportunities)
-    converted_leads = Lead.objects.filter(organization=organization, converted_opportunity__isnull=False).count()
-    conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
-    
-    # Average deal size
-    average_deal_size = won_stats['total_value'] / won_stats['count'] if won_stats['count'] > 0 else 0
-    
-    stats = {
-        'total_contacts': total_contacts,
-        'total_leads': total_leads,
-        'total_opportunities': total_opportunities,
-        'total_campaigns': total_campaigns,
-        'leads_by_status': leads_by_status,
-        'opportunities_by_stage': opportunities_by_stage,
-        'total_pipeline_value': pipeline_stats['total_value'] or 0,
-        'weighted_pipeline_value': pipeline_stats['weighted_value'] or 0,
-        'won_opportunities_count': won_stats['count'] or 0,
-        'won_opportunities_value': won_stats['total_value'] or 0,
-        'conversion_rate': conversion_rate,
-        'average_deal_size': average_deal_size
-    }
+    stats = get_crm_stats(request.user.organization)
     
     serializer = CRMStatsSerializer(stats)
     return Response(serializer.data)
@@ -306,27 +502,35 @@ def crm_stats_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def sales_pipeline_view(request):
-    """Get sales pipeline data."""
+    """Get per-stage pipeline totals in a single grouped query.
     
-    organization = request.user.organization
+    Opportunities for each stage are loaded separately through
+    ``PipelineStageOpportunityListView``.
+    """
     
-    pipeline_data = []
-    stages = ['qualification', 'needs_analysis', 'proposal', 'negotiation']
+    organization = request.user.organization
     
-    for stage in stages:
-        opportunities = Opportunity.objects.filter(
+    totals = {
+        row['stage']: row
+        for row in Opportunity.objects.filter(
             organization=organization,
-            stage=stage
-        ).select_related('contact', 'assigned_to')
-        
-        stage_data = {
+            stage__in=Opportunity.OPEN_STAGES
+        ).order_by().values('stage').annotate(
+            count=Count('id'),
+            total_value=Sum('estimated_value'),
+            weighted_value=weighted_value_sum()
+        )
+    }
+    
+    pipeline_data = []
+    for stage in Opportunity.OPEN_STAGES:
+        row = totals.get(stage, {})
+        pipeline_data.append({
             'stage': stage,
-            'count': opportunities.count(),
-            'total_value': sum(opp.estimated_value for opp in opportunities),
-            'weighted_value': sum(opp.weighted_value for opp in opportunities),
-            'opportunities': OpportunityListSerializer(opportunities, many=True).data
-        }
-        pipeline_data.append(stage_data)
+            'count': row.get('count', 0),
+            'total_value': row.get('total_value') or 0,
+            'weighted_value': row.get('weighted_value') or 0,
+        })
     
     serializer = SalesPipelineSerializer(pipeline_data, many=True)
     return Response(serializer.data)
@@ -334,55 +538,123 @@ def sales_pipeline_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def my_leads_view(request):
-    """Get leads assigned to current user."""
+def sales_forecast_view(request):
+    """Get monthly forecast totals by expected close date.
     
-    leads = Lead.objects.filter(
-        organization=request.user.organization,
-        assigned_to=request.user
-    ).order_by('-created_at')
+    Defaults to the current month and the following eleven. Pass
+    ``group_by=assignee`` or ``group_by=stage`` for per-month breakdowns.
+    """
     
-    serializer = LeadListSerializer(leads, many=True)
-    return Response(serializer.data)
+    query = SalesForecastQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    start = query.validated_data.get('start') or timezone.now().date()
+    start = start.replace(day=1)
+    end = query.validated_data.get('end') or add_months(start, 11)
+    end = min(end.replace(day=1), add_months(start, MAX_FORECAST_MONTHS - 1))
+    group_by = query.validated_data.get('group_by')
+    
+    forecast = compute_forecast(request.user.organization, start, end, group_by)
+    
+    return Response({
+        'start': start,
+        'end': end,
+        'group_by': group_by,
+        'months': SalesForecastSerializer(forecast, many=True).data
+    })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def my_opportunities_view(request):
-    """Get opportunities assigned to current user."""
+def pipeline_velocity_view(request):
+    """Get average days per stage and stage conversion rates.
     
-    opportunities = Opportunity.objects.filter(
-        organization=request.user.organization,
-        assigned_to=request.user
-    ).select_related('contact').order_by('-created_at')
+    Served from the hourly rollup; ``?refresh=true`` recomputes it first.
+    """
+    
+    organization = request.user.organization
+    rollup = list(OpportunityStageVelocity.objects.filter(organization=organization))
+    
+    if not rollup or request.query_params.get('refresh') == 'true':
+        rollup = refresh_stage_velocity(organization.pk)
     
-    serializer = OpportunityListSerializer(opportunities, many=True)
+    rollup.sort(key=lambda row: Opportunity.OPEN_STAGES.index(row.stage))
+    serializer = OpportunityStageVelocitySerializer(rollup, many=True)
     return Response(serializer.data)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def overdue_activities_view(request):
-    """Get overdue activities for CRM objects."""
+class PipelineStageOpportunityListView(generics.ListAPIView):
+    """Paginated opportunities for a single pipeline stage."""
     
-    from apps.core.models import Activity
-    from django.contrib.contenttypes.models import ContentType
+    serializer_class = OpportunityListSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['priority', 'assigned_to']
+    ordering_fields = ['estimated_value', 'probability', 'expected_close_date', 'created_at']
+    ordering = ['-created_at']
     
-    # Get content types for CRM models
-    lead_ct = ContentType.objects.get_for_model(Lead)
-    opportunity_ct = ContentType.objects.get_for_model(Opportunity)
-    contact_ct = ContentType.objects.get_for_model(Contact)
+    def get_queryset(self):
+        stage = self.kwargs['stage']
+        if stage not in Opportunity.OPEN_STAGES:
+            raise NotFound('Unknown pipeline stage')
+        return Opportunity.objects.filter(
+            organization=self.request.user.organization,
+            stage=stage
+        ).select_related('contact', 'assigned_to')
+
+
+class MyLeadListView(generics.ListAPIView):
+    """List leads assigned to current user, newest first by cursor."""
     
-    overdue_activities = Activity.objects.filter(
-        organization=request.user.organization,
-        status='pending',
-        scheduled_date__lt=timezone.now().date(),
-        content_type__in=[lead_ct, opportunity_ct, contact_ct]
-    ).select_related('assigned_to').order_by('scheduled_date')
+    serializer_class = LeadListSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['status', 'priority', 'source', 'campaign']
+    search_fields = ['title', 'contact_name', 'company_name', 'email']
+    # Cursors need a non-null, effectively unique ordering
+    ordering_fields = ['created_at']
+    ordering = ['-created_at']
     
-    from apps.core.serializers import ActivitySerializer
-    serializer = ActivitySerializer(overdue_activities, many=True)
-    return Response(serializer.data)
+    def get_queryset(self):
+        return Lead.objects.filter(
+            organization=self.request.user.organization,
+            assigned_to=self.request.user
+        ).select_related('assigned_to')
+
+
+class MyOpportunityListView(generics.ListAPIView):
+    """List opportunities assigned to current user, newest first by cursor."""
+    
+    serializer_class = OpportunityListSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['stage', 'priority', 'contact', 'campaign']
+    search_fields = ['name', 'contact__first_name', 'contact__last_name', 'contact__company_name']
+    # Cursors need a non-null, effectively unique ordering
+    ordering_fields = ['created_at']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        return Opportunity.objects.filter(
+            organization=self.request.user.organization,
+            assigned_to=self.request.user
+        ).select_related('contact', 'assigned_to')
+
+
+class OverdueActivityListView(generics.ListAPIView):
+    """List overdue activities attached to CRM objects."""
+    
+    serializer_class = ActivitySerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return overdue_activities(
+            self.request.user.organization,
+            models=[Lead, Opportunity, Contact]
+        )
 
 
 @api_view(['GET'])
@@ -390,19 +662,10 @@ def overdue_activities_view(request):
 def recent_activities_view(request):
     """Get recent activities for CRM objects."""
     
-    from apps.core.models import Activity
-    from django.contrib.contenttypes.models import ContentType
-    
-    # Get content types for CRM models
-    lead_ct = ContentType.objects.get_for_model(Lead)
-    opportunity_ct = ContentType.objects.get_for_model(Opportunity)
-    contact_ct = ContentType.objects.get_for_model(Contact)
-    
     recent_activities = Activity.objects.filter(
         organization=request.user.organization,
-        content_type__in=[lead_ct, opportunity_ct, contact_ct]
-    ).select_related('assigned_to').order_by('-created_at')[:20]
+        content_type_id__in=content_type_ids(Lead, Opportunity, Contact)
+    ).select_related('assigned_to', 'created_by').order_by('-created_at')[:20]
     
-    from apps.core.serializers import ActivitySerializer
     serializer = ActivitySerializer(recent_activities, many=True)
     return Response(serializer.data)
@@ -6,19 +6,37 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils import timezone
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from apps.core.admin_utils import AutocompleteFilter, AutocompleteFilterMixin, EstimatedCountPaginator
 from .models import (
     Category, Brand, Supplier, Product, Warehouse, StockLevel,
     StockMovement, StockAdjustment, StockAdjustmentLine,
-    PurchaseOrder, PurchaseOrderLine
+    PurchaseOrder, PurchaseOrderLine, SupplierMetrics
 )
 
 
+def active_products_count_subquery(field_name):
+    """Correlated subquery counting active products that point at the outer row."""
+    return Coalesce(
+        Subquery(
+            Product.objects.filter(**{field_name: OuterRef('pk')}, is_active=True)
+            .order_by()
+            .values(field_name)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for Category model."""
     
     list_display = ['name', 'parent_category', 'full_path', 'is_active', 'products_count', 'created_at']
-    list_filter = ['is_active', 'parent_category', 'created_at']
+    list_filter = ['is_active', ('parent_category', AutocompleteFilter), 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['id', 'full_path', 'created_at', 'updated_at']
     ordering = ['name']
@@ -34,11 +52,14 @@ class CategoryAdmin(admin.ModelAdmin):
     )
     
     def products_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        return obj.active_products_count
     products_count.short_description = 'Products'
+    products_count.admin_order_field = 'active_products_count'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('parent_category')
+        return super().get_queryset(request).select_related(
+            'parent_category__parent_category'
+        ).annotate(active_products_count=active_products_count_subquery('category'))
 
 
 @admin.register(Brand)
@@ -62,8 +83,14 @@ class BrandAdmin(admin.ModelAdmin):
     )
     
     def products_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        return obj.active_products_count
     products_count.short_description = 'Products'
+    products_count.admin_order_field = 'active_products_count'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            active_products_count=active_products_count_subquery('brand')
+        )
 
 
 @admin.register(Supplier)
@@ -97,16 +124,16 @@ class SupplierAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for Product model."""
     
     list_display = [
         'name', 'sku', 'product_type', 'category', 'brand', 'cost_price',
-        'selling_price', 'current_stock_display', 'is_low_stock', 'is_active'
+        'selling_price', 'current_stock_display', 'low_stock_display', 'is_active'
     ]
     list_filter = [
-        'product_type', 'category', 'brand', 'is_active', 'is_sellable',
-        'is_purchasable', 'track_inventory', 'created_at'
+        'product_type', ('category', AutocompleteFilter), ('brand', AutocompleteFilter),
+        'is_active', 'is_sellable', 'is_purchasable', 'track_inventory', 'created_at'
     ]
     search_fields = ['name', 'sku', 'barcode', 'description']
     readonly_fields = [
@@ -148,14 +175,31 @@ class ProductAdmin(admin.ModelAdmin):
     )
     
     def current_stock_display(self, obj):
-        stock = obj.current_stock
-        if obj.is_low_stock:
+        stock = obj.current_stock_total
+        if stock <= obj.minimum_stock_level:
             return format_html('<span style="color: red;">{}</span>', stock)
         return stock
     current_stock_display.short_description = 'Current Stock'
+    current_stock_display.admin_order_field = 'current_stock_total'
+    
+    def low_stock_display(self, obj):
+        return obj.current_stock_total <= obj.minimum_stock_level
+    low_stock_display.boolean = True
+    low_stock_display.short_description = 'Is low stock'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('category', 'brand')
+        stock_total = (
+            StockLevel.objects.filter(product=OuterRef('pk'), warehouse__is_active=True)
+            .order_by()
+            .values('product')
+            .annotate(total=Sum('quantity_on_hand'))
+            .values('total')
+        )
+        return super().get_queryset(request).select_related(
+            'category__parent_category', 'brand'
+        ).annotate(
+            current_stock_total=Coalesce(Subquery(stock_total, output_field=IntegerField()), Value(0))
+        )
 
 
 @admin.register(Warehouse)
@@ -192,14 +236,14 @@ class WarehouseAdmin(admin.ModelAdmin):
 
 
 @admin.register(StockLevel)
-class StockLevelAdmin(admin.ModelAdmin):
+class StockLevelAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for StockLevel model."""
     
     list_display = [
         'product', 'warehouse', 'quantity_on_hand', 'quantity_reserved',
         'quantity_on_order', 'available_quantity_display', 'location'
     ]
-    list_filter = ['warehouse', 'product__category', 'created_at']
+    list_filter = [('warehouse', AutocompleteFilter), ('product__category', AutocompleteFilter), 'created_at']
     search_fields = ['product__name', 'product__sku', 'warehouse__name', 'location']
     readonly_fields = ['id', 'available_quantity', 'created_at', 'updated_at']
     ordering = ['product__name']
@@ -217,26 +261,35 @@ class StockLevelAdmin(admin.ModelAdmin):
         }),
     )
     
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
     def available_quantity_display(self, obj):
-        return obj.available_quantity
+        return obj.available_quantity_value
     available_quantity_display.short_description = 'Available'
+    available_quantity_display.admin_order_field = 'available_quantity_value'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('product', 'warehouse')
+        return super().get_queryset(request).select_related('product', 'warehouse').annotate(
+            available_quantity_value=Greatest(F('quantity_on_hand') - F('quantity_reserved'), Value(0))
+        )
 
 
 @admin.register(StockMovement)
-class StockMovementAdmin(admin.ModelAdmin):
+class StockMovementAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for StockMovement model."""
     
     list_display = [
         'product', 'warehouse', 'movement_type', 'quantity', 'unit_cost',
         'reference_document', 'stock_after_movement', 'created_at'
     ]
-    list_filter = ['movement_type', 'reference_type', 'warehouse', 'created_at']
+    list_filter = ['movement_type', 'reference_type', ('warehouse', AutocompleteFilter), 'created_at']
     search_fields = ['product__name', 'product__sku', 'reference_document', 'reason']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    raw_id_fields = ['product', 'warehouse']
     ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Movement Details', {
@@ -273,14 +326,14 @@ class StockAdjustmentLineInline(admin.TabularInline):
 
 
 @admin.register(StockAdjustment)
-class StockAdjustmentAdmin(admin.ModelAdmin):
+class StockAdjustmentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for StockAdjustment model."""
     
     list_display = [
         'adjustment_number', 'adjustment_date', 'adjustment_type', 'warehouse',
         'total_items', 'approval_status', 'created_at'
     ]
-    list_filter = ['adjustment_type', 'reason', 'warehouse', 'adjustment_date', 'created_at']
+    list_filter = ['adjustment_type', 'reason', ('warehouse', AutocompleteFilter), 'adjustment_date', 'created_at']
     search_fields = ['adjustment_number', 'notes']
     readonly_fields = ['id', 'adjustment_number', 'approved_at', 'created_at', 'updated_at']
     ordering = ['-adjustment_date']
@@ -347,14 +400,17 @@ class PurchaseOrderLineInline(admin.TabularInline):
 
 
 @admin.register(PurchaseOrder)
-class PurchaseOrderAdmin(admin.ModelAdmin):
+class PurchaseOrderAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for PurchaseOrder model."""
     
     list_display = [
         'po_number', 'supplier', 'warehouse', 'order_date',
         'expected_delivery_date', 'status', 'total_amount', 'created_at'
     ]
-    list_filter = ['status', 'supplier', 'warehouse', 'order_date', 'created_at']
+    list_filter = [
+        'status', ('supplier', AutocompleteFilter), ('warehouse', AutocompleteFilter),
+        'order_date', 'created_at'
+    ]
     search_fields = ['po_number', 'supplier__name', 'notes']
     readonly_fields = ['id', 'po_number', 'created_at', 'updated_at']
     ordering = ['-order_date']
@@ -399,11 +455,11 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 
 # Register the StockAdjustmentLine separately for direct access
 @admin.register(StockAdjustmentLine)
-class StockAdjustmentLineAdmin(admin.ModelAdmin):
+class StockAdjustmentLineAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for StockAdjustmentLine model."""
     
     list_display = ['adjustment', 'product', 'expected_quantity', 'actual_quantity', 'difference', 'unit_cost']
-    list_filter = ['adjustment__adjustment_type', 'adjustment__warehouse']
+    list_filter = ['adjustment__adjustment_type', ('adjustment__warehouse', AutocompleteFilter)]
     search_fields = ['product__name', 'product__sku', 'adjustment__adjustment_number']
     readonly_fields = ['difference']
     ordering = ['adjustment__adjustment_date']
@@ -412,19 +468,57 @@ class StockAdjustmentLineAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('adjustment', 'product')
 
 
+class FullyReceivedFilter(admin.SimpleListFilter):
+    """Filter purchase order lines on whether all ordered units arrived."""
+    
+    title = 'fully received'
+    parameter_name = 'fully_received'
+    
+    def lookups(self, request, model_admin):
+        return [('yes', 'Yes'), ('no', 'No')]
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(quantity_received__gte=F('quantity_ordered'))
+        if self.value() == 'no':
+            return queryset.filter(quantity_received__lt=F('quantity_ordered'))
+        return queryset
+
+
 # Register the PurchaseOrderLine separately for direct access
 @admin.register(PurchaseOrderLine)
-class PurchaseOrderLineAdmin(admin.ModelAdmin):
+class PurchaseOrderLineAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin configuration for PurchaseOrderLine model."""
     
     list_display = [
         'purchase_order', 'product', 'quantity_ordered', 'quantity_received',
         'quantity_pending', 'unit_price', 'line_total', 'is_fully_received'
     ]
-    list_filter = ['purchase_order__status', 'purchase_order__supplier', 'is_fully_received']
+    list_filter = ['purchase_order__status', ('purchase_order__supplier', AutocompleteFilter), FullyReceivedFilter]
     search_fields = ['product__name', 'product__sku', 'purchase_order__po_number']
     readonly_fields = ['line_total', 'quantity_pending', 'is_fully_received']
     ordering = ['purchase_order__order_date']
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('purchase_order', 'product')
+
+
+@admin.register(SupplierMetrics)
+class SupplierMetricsAdmin(admin.ModelAdmin):
+    """Admin configuration for SupplierMetrics model."""
+    
+    list_display = [
+        'supplier', 'total_orders', 'received_orders', 'average_lead_time_days',
+        'fill_rate', 'on_time_percentage', 'last_calculated_at'
+    ]
+    list_select_related = ['supplier']
+    search_fields = ['supplier__name']
+    readonly_fields = [
+        'id', 'supplier', 'total_orders', 'received_orders', 'on_time_orders',
+        'average_lead_time_days', 'fill_rate', 'on_time_percentage',
+        'last_calculated_at', 'created_at', 'updated_at'
+    ]
+    ordering = ['supplier__name']
+    
+    def has_add_permission(self, request):
+        return False
@@ -5,7 +5,7 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from decimal import Decimal
-from apps.core.models import BaseModel
+from apps.core.models import BaseModel, RelatedObjectsModel
 import uuid
 
 
@@ -63,7 +63,7 @@ class Brand(BaseModel):
         return self.name
 
 
-class Supplier(BaseModel):
+class Supplier(BaseModel, RelatedObjectsModel):
     """Supplier model for inventory management."""
     
     SUPPLIER_TYPES = [
@@ -117,7 +117,7 @@ class Supplier(BaseModel):
         return self.name
 
 
-class Product(BaseModel):
+class Product(BaseModel, RelatedObjectsModel):
     """Product model for inventory management."""
     
     PRODUCT_TYPES = [
@@ -238,7 +238,7 @@ class Product(BaseModel):
         return 0
 
 
-class Warehouse(BaseModel):
+class Warehouse(BaseModel, RelatedObjectsModel):
     """Warehouse model for inventory locations."""
     
     name = models.CharField(max_length=255)
@@ -490,7 +490,7 @@ class StockAdjustmentLine(BaseModel):
         super().save(*args, **kwargs)
 
 
-class PurchaseOrder(BaseModel):
+class PurchaseOrder(BaseModel, RelatedObjectsModel):
     """Purchase order model for inventory procurement."""
     
     STATUS_CHOICES = [
@@ -592,3 +592,103 @@ class PurchaseOrderLine(BaseModel):
     def save(self, *args, **kwargs):
         self.line_total = self.quantity_ordered * self.unit_price
         super().save(*args, **kwargs)
+
+
+class SupplierMetrics(BaseModel):
+    """Denormalized supplier performance metrics, refreshed on PO status changes."""
+    
+    supplier = models.OneToOneField(
+        Supplier,
+        on_delete=models.CASCADE,
+        related_name='metrics'
+    )
+    
+    # Order counts
+    total_orders = models.PositiveIntegerField(default=0)
+    received_orders = models.PositiveIntegerField(default=0)
+    on_time_orders = models.PositiveIntegerField(default=0)
+    
+    # Performance
+    average_lead_time_days = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    fill_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    on_time_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    
+    last_calculated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'inventory_supplier_metrics'
+        verbose_name_plural = 'Supplier metrics'
+        indexes = [
+            models.Index(fields=['organization', 'on_time_percentage']),
+            models.Index(fields=['organization', 'fill_rate']),
+            models.Index(fields=['organization', 'average_lead_time_days']),
+        ]
+    
+    def __str__(self):
+        return f"Metrics for {self.supplier.name}"
+    
+    @classmethod
+    def refresh_for_supplier(cls, supplier):
+        """Recalculate metrics for a single supplier from its purchase orders."""
+        orders = PurchaseOrder.objects.filter(supplier=supplier).exclude(status='cancelled')
+        delivered = orders.filter(
+            status__in=['partially_received', 'received'],
+            actual_delivery_date__isnull=False
+        )
+        
+        order_stats = orders.aggregate(
+            total_orders=models.Count('id'),
+            received_orders=models.Count('id', filter=models.Q(status='received')),
+        )
+        delivery_stats = delivered.aggregate(
+            average_lead_time=models.Avg(
+                models.ExpressionWrapper(
+                    models.F('actual_delivery_date') - models.F('order_date'),
+                    output_field=models.DurationField()
+                )
+            ),
+            scheduled_orders=models.Count('id', filter=models.Q(expected_delivery_date__isnull=False)),
+            on_time_orders=models.Count(
+                'id',
+                filter=models.Q(actual_delivery_date__lte=models.F('expected_delivery_date'))
+            ),
+        )
+        line_stats = PurchaseOrderLine.objects.filter(
+            purchase_order__in=delivered
+        ).aggregate(
+            ordered=models.Sum('quantity_ordered'),
+            received=models.Sum('quantity_received'),
+        )
+        
+        average_lead_time = None
+        if delivery_stats['average_lead_time'] is not None:
+            average_lead_time = round(
+                Decimal(delivery_stats['average_lead_time'].total_seconds()) / Decimal(86400), 2
+            )
+        
+        fill_rate = None
+        if line_stats['ordered']:
+            fill_rate = round(
+                Decimal(min(line_stats['received'] or 0, line_stats['ordered'])) * 100 / line_stats['ordered'], 2
+            )
+        
+        on_time_percentage = None
+        if delivery_stats['scheduled_orders']:
+            on_time_percentage = round(
+                Decimal(delivery_stats['on_time_orders']) * 100 / delivery_stats['scheduled_orders'], 2
+            )
+        
+        metrics, created = cls.objects.update_or_create(
+            supplier=supplier,
+            defaults={
+                'organization_id': supplier.organization_id,
+                'total_orders': order_stats['total_orders'],
+                'received_orders': order_stats['received_orders'],
+                'on_time_orders': delivery_stats['on_time_orders'],
+                'average_lead_time_days': average_lead_time,
+                'fill_rate': fill_rate,
+                'on_time_percentage': on_time_percentage,
+                'last_calculated_at': timezone.now(),
+            }
+        )
+        return metrics
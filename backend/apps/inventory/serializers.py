@@ -6,7 +6,7 @@ from django.contrib.auth import get_user_model
 from .models import (
     Category, Brand, Supplier, Product, Warehouse, StockLevel,
     StockMovement, StockAdjustment, StockAdjustmentLine,
-    PurchaseOrder, PurchaseOrderLine
+    PurchaseOrder, PurchaseOrderLine, SupplierMetrics
 )
 
 User = get_user_model()
@@ -64,11 +64,25 @@ class BrandSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class SupplierMetricsSerializer(serializers.ModelSerializer):
+    """Serializer for SupplierMetrics model."""
+    
+    class Meta:
+        model = SupplierMetrics
+        fields = [
+            'total_orders', 'received_orders', 'on_time_orders',
+            'average_lead_time_days', 'fill_rate', 'on_time_percentage',
+            'last_calculated_at'
+        ]
+        read_only_fields = fields
+
+
 class SupplierSerializer(serializers.ModelSerializer):
     """Serializer for Supplier model."""
     
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     purchase_orders_count = serializers.SerializerMethodField()
+    metrics = serializers.SerializerMethodField()
     
     class Meta:
         model = Supplier
@@ -76,14 +90,23 @@ class SupplierSerializer(serializers.ModelSerializer):
             'id', 'name', 'supplier_type', 'contact_person', 'email', 'phone',
             'website', 'street_address', 'city', 'state', 'postal_code',
             'country', 'tax_id', 'payment_terms', 'credit_limit', 'is_active',
-            'rating', 'tags', 'purchase_orders_count', 'created_by_name',
+            'rating', 'tags', 'purchase_orders_count', 'metrics', 'created_by_name',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'metrics', 'created_at', 'updated_at']
     
     def get_purchase_orders_count(self, obj):
+        if hasattr(obj, 'purchase_orders_total'):
+            return obj.purchase_orders_total
         return obj.purchase_orders.count()
     
+    def get_metrics(self, obj):
+        try:
+            metrics = obj.metrics
+        except SupplierMetrics.DoesNotExist:
+            return None
+        return SupplierMetricsSerializer(metrics).data
+    
     def create(self, validated_data):
         validated_data['organization'] = self.context['request'].user.organization
         validated_data['created_by'] = self.context['request'].user
@@ -0,0 +1,101 @@
+"""
+Signal handlers for Inventory module.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.counters import track_record_count
+from apps.core.queries import register_query_model
+from .models import (
+    Product, Supplier, Warehouse, StockLevel, StockMovement, PurchaseOrder, PurchaseOrderLine, SupplierMetrics
+)
+
+for model in (Product, Supplier, Warehouse, StockMovement, PurchaseOrder):
+    track_record_count(model)
+    register_query_model(model)
+register_query_model(StockLevel)
+
+
+# PO fields the supplier metrics are computed from
+METRIC_FIELDS = ['status', 'supplier_id', 'order_date', 'expected_delivery_date', 'actual_delivery_date']
+
+_local = threading.local()
+
+
+class SupplierMetricsRefresh:
+    """Suppliers whose metrics changed in one transaction, refreshed together on commit."""
+
+    def __init__(self):
+        self.supplier_ids = set()
+
+    def flush(self):
+        for supplier in Supplier.objects.filter(pk__in=self.supplier_ids):
+            SupplierMetrics.refresh_for_supplier(supplier)
+
+
+def refresh_supplier_metrics_on_commit(*supplier_ids):
+    """Refresh the metrics of ``supplier_ids`` once, when the transaction commits."""
+    supplier_ids = {supplier_id for supplier_id in supplier_ids if supplier_id}
+    if not supplier_ids:
+        return
+    connection = transaction.get_connection()
+    pending = getattr(_local, 'refresh', None)
+    # Reuse a refresh only within its savepoint, so a rollback cannot drop suppliers added later
+    savepoint_ids = set(connection.savepoint_ids)
+    if pending is not None and any(
+        entry[1] == pending.flush and set(entry[0]) == savepoint_ids
+        for entry in connection.run_on_commit
+    ):
+        pending.supplier_ids.update(supplier_ids)
+        return
+    pending = _local.refresh = SupplierMetricsRefresh()
+    pending.supplier_ids.update(supplier_ids)
+    transaction.on_commit(pending.flush)
+
+
+@receiver(pre_save, sender=PurchaseOrder)
+def track_purchase_order_metric_fields(sender, instance, **kwargs):
+    """Remember the stored metric fields so post_save can detect changes."""
+    if instance._state.adding:
+        instance._previous_metric_values = None
+        return
+    instance._previous_metric_values = (
+        PurchaseOrder.objects.filter(pk=instance.pk)
+        .values(*METRIC_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=PurchaseOrder)
+def refresh_supplier_metrics_on_change(sender, instance, created, **kwargs):
+    """Refresh the supplier's metrics when a PO field they depend on changes."""
+    previous = getattr(instance, '_previous_metric_values', None)
+    if created or previous is None:
+        refresh_supplier_metrics_on_commit(instance.supplier_id)
+        return
+    if any(previous[field] != getattr(instance, field) for field in METRIC_FIELDS):
+        # A reassigned PO changes the metrics of both suppliers
+        refresh_supplier_metrics_on_commit(previous['supplier_id'], instance.supplier_id)
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+def refresh_supplier_metrics_on_delete(sender, instance, **kwargs):
+    """Keep supplier metrics in sync when a PO is removed."""
+    refresh_supplier_metrics_on_commit(instance.supplier_id)
+
+
+@receiver([post_save, post_delete], sender=PurchaseOrderLine)
+def refresh_supplier_metrics_on_line_change(sender, instance, **kwargs):
+    """Fill rates depend on line quantities, so line writes refresh the PO's supplier."""
+    if PurchaseOrderLine.purchase_order.is_cached(instance):
+        supplier_id = instance.purchase_order.supplier_id
+    else:
+        supplier_id = (
+            PurchaseOrder.objects.filter(pk=instance.purchase_order_id)
+            .values_list('supplier_id', flat=True)
+            .first()
+        )
+    refresh_supplier_metrics_on_commit(supplier_id)
@@ -18,6 +18,7 @@ urlpatterns = [
     # Suppliers
     path('suppliers/', views.SupplierListCreateView.as_view(), name='supplier-list-create'),
     path('suppliers/<uuid:pk>/', views.SupplierDetailView.as_view(), name='supplier-detail'),
+    path('suppliers/ranking/', views.SupplierRankingView.as_view(), name='supplier-ranking'),
     
     # Products
     path('products/', views.ProductListCreateView.as_view(), name='product-list-create'),
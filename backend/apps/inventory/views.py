@@ -88,7 +88,11 @@ class SupplierListCreateView(generics.ListCreateAPIView):
     ordering = ['name']
     
     def get_queryset(self):
-        return Supplier.objects.filter(organization=self.request.user.organization)
+        return Supplier.objects.filter(
+            organization=self.request.user.organization
+        ).select_related('metrics').prefetch_related('tags').annotate(
+            purchase_orders_total=Count('purchase_orders')
+        )
 
 
 class SupplierDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -98,7 +102,37 @@ class SupplierDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Supplier.objects.filter(organization=self.request.user.organization)
+        return Supplier.objects.filter(
+            organization=self.request.user.organization
+        ).select_related('metrics')
+
+
+class SupplierRankingView(generics.ListAPIView):
+    """Rank active suppliers by their precomputed performance metrics."""
+    
+    serializer_class = SupplierSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['supplier_type']
+    ordering_fields = [
+        'metrics__on_time_percentage', 'metrics__fill_rate',
+        'metrics__average_lead_time_days', 'metrics__total_orders'
+    ]
+    # Suppliers without a rate yet rank after those with one
+    ordering = [
+        F('metrics__on_time_percentage').desc(nulls_last=True),
+        F('metrics__fill_rate').desc(nulls_last=True),
+        'metrics__average_lead_time_days'
+    ]
+    
+    def get_queryset(self):
+        return Supplier.objects.filter(
+            organization=self.request.user.organization,
+            is_active=True,
+            metrics__average_lead_time_days__isnull=False
+        ).select_related('metrics').prefetch_related('tags').annotate(
+            purchase_orders_total=Count('purchase_orders')
+        )
 
 
 class ProductListCreateView(generics.ListCreateAPIView):
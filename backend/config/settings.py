@@ -48,6 +48,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.core.middleware.ResponseTimeMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -182,6 +183,33 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+from celery.schedules import crontab
+CELERY_BEAT_SCHEDULE = {
+    'refresh-opportunity-stage-velocity': {
+        'task': 'apps.crm.tasks.refresh_stage_velocity_task',
+        'schedule': 60 * 60,
+    },
+    'score-leads-nightly': {
+        'task': 'apps.crm.tasks.score_leads_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'reconcile-record-counts': {
+        'task': 'apps.core.tasks.reconcile_record_counts_task',
+        'schedule': 60 * 60,
+    },
+    'purge-workflow-executions': {
+        'task': 'apps.core.tasks.purge_workflow_executions_task',
+        'schedule': crontab(hour=3, minute=0),
+    },
+}
+
+# Days finished workflow executions are kept before being purged
+WORKFLOW_EXECUTION_RETENTION_DAYS = config('WORKFLOW_EXECUTION_RETENTION_DAYS', default=30, cast=int)
+# Days executions stuck in pending or running are kept before being purged
+WORKFLOW_STALE_EXECUTION_RETENTION_DAYS = config('WORKFLOW_STALE_EXECUTION_RETENTION_DAYS', default=7, cast=int)
+
+# Threads used to compute the widgets of a dashboard in parallel
+WIDGET_QUERY_WORKERS = config('WIDGET_QUERY_WORKERS', default=4, cast=int)
 
 # Cache Configuration
 CACHES = {
@@ -196,12 +224,17 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
+# Campaign email delivery (messages per second across all workers)
+CAMPAIGN_EMAIL_RATE_LIMIT = config('CAMPAIGN_EMAIL_RATE_LIMIT', default=10, cast=float)
+CAMPAIGN_EMAIL_BATCH_SIZE = config('CAMPAIGN_EMAIL_BATCH_SIZE', default=500, cast=int)
 
 # Logging Configuration
 LOGGING = {
@@ -72,6 +72,28 @@ const apiService = {
   getCurrentUser: () =>
     apiRequest<any>('get', '/auth/me/'),
   
+  // Core endpoints
+  getRelatedObjectsBatch: (
+    objects: { content_type: number; object_id: string }[],
+    countsOnly?: boolean
+  ) =>
+    apiRequest<any>('post', '/core/related-objects/batch/', { objects, counts_only: !!countsOnly }),
+  
+  getDashboardWidgetData: (id: string) =>
+    apiRequest<any>('get', `/core/dashboards/${id}/data/`),
+  
+  getReports: (params?: any) =>
+    apiRequest<any>('get', '/core/reports/', undefined, { params }),
+  
+  runReport: (id: string) =>
+    apiRequest<any>('post', `/core/reports/${id}/run/`),
+  
+  getReportResult: (id: string, taskId?: string) =>
+    apiRequest<any>('get', `/core/reports/${id}/result/`, undefined, { params: { task_id: taskId } }),
+  
+  getOrganizationSettings: () =>
+    apiRequest<any>('get', '/core/settings/'),
+  
   // CRM endpoints
   getContacts: (params?: any) =>
     apiRequest<any>('get', '/crm/contacts/', undefined, { params }),
@@ -88,6 +110,12 @@ const apiService = {
   deleteContact: (id: string) =>
     apiRequest<any>('delete', `/crm/contacts/${id}/`),
   
+  autocompleteContacts: (q: string) =>
+    apiRequest<any>('get', '/crm/contacts/autocomplete/', undefined, { params: { q } }),
+  
+  getContactHierarchy: (id: string, params?: { direction?: 'descendants' | 'ancestors'; max_depth?: number }) =>
+    apiRequest<any>('get', `/crm/contacts/${id}/hierarchy/`, undefined, { params }),
+  
   getLeads: (params?: any) =>
     apiRequest<any>('get', '/crm/leads/', undefined, { params }),
   
@@ -106,6 +134,12 @@ const apiService = {
   convertLead: (id: string, data: any) =>
     apiRequest<any>('post', `/crm/leads/${id}/convert/`, data),
   
+  bulkConvertLeads: (data: { lead_ids?: string[]; campaign?: string }) =>
+    apiRequest<any>('post', '/crm/leads/bulk-convert/', data),
+  
+  getBulkConvertLeadsStatus: (taskId: string) =>
+    apiRequest<any>('get', `/crm/leads/bulk-convert/${taskId}/`),
+  
   getOpportunities: (params?: any) =>
     apiRequest<any>('get', '/crm/opportunities/', undefined, { params }),
   
@@ -127,6 +161,18 @@ const apiService = {
   getCrmStats: () =>
     apiRequest<any>('get', '/crm/stats/'),
   
+  getSalesPipeline: () =>
+    apiRequest<any>('get', '/crm/pipeline/'),
+  
+  getPipelineVelocity: (refresh?: boolean) =>
+    apiRequest<any>('get', '/crm/pipeline/velocity/', undefined, { params: refresh ? { refresh: true } : undefined }),
+  
+  getSalesForecast: (params?: { start?: string; end?: string; group_by?: 'assignee' | 'stage' }) =>
+    apiRequest<any>('get', '/crm/forecast/', undefined, { params }),
+  
+  getPipelineStageOpportunities: (stage: string, params?: any) =>
+    apiRequest<any>('get', `/crm/pipeline/${stage}/opportunities/`, undefined, { params }),
+  
   // Inventory endpoints
   getProducts: (params?: any) =>
     apiRequest<any>('get', '/inventory/products/', undefined, { params }),